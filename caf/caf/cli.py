@@ -1,13 +1,12 @@
 """Command Line Interface (CLI) for CAF."""
 
 import argparse
+import importlib
 import sys
 from typing import Any
 
 from libcaf.constants import DEFAULT_REPO_DIR
 
-from caf import cli_commands
-
 _repo_args: dict[str, dict[str, Any]] = {
     'working_dir_path': {
         'type': str,
@@ -22,164 +21,194 @@ _repo_args: dict[str, dict[str, Any]] = {
 }
 
 
-def cli() -> None:
-    parser = argparse.ArgumentParser(description='CAF Command Line Interface')
-    commands_sub = parser.add_subparsers(title='✨ Available Commands ✨', dest='command',
-                                         help='Choose a command to execute')
-
-    # Dictionary to map command names to their functions and descriptions
-    commands: dict[str, dict[str, Any]] = {
-        'init': {
-            'func': cli_commands.init,
-            'args': {
-                **_repo_args,
-                'default_branch': {
-                    'type': str,
-                    'help': '🌱 Name of the default branch (default: "main")',
-                    'default': 'main',
-                },
+# Dictionary to map command names to their functions and descriptions
+_commands: dict[str, dict[str, Any]] = {
+    'init': {
+        'func': 'init',
+        'args': {
+            **_repo_args,
+            'default_branch': {
+                'type': str,
+                'help': '🌱 Name of the default branch (default: "main")',
+                'default': 'main',
             },
-            'help': '🛠️ Initialize a new CAF repository',
         },
+        'help': '🛠️ Initialize a new CAF repository',
+    },
 
-        'delete_repo': {
-            'func': cli_commands.delete_repo,
-            'args': {
-                **_repo_args,
-            },
-            'help': '🗑️ Delete the repository',
+    'delete_repo': {
+        'func': 'delete_repo',
+        'args': {
+            **_repo_args,
         },
+        'help': '🗑️ Delete the repository',
+    },
 
-        'commit': {
-            'func': cli_commands.commit,
-            'args': {
-                **_repo_args,
-                'author': {
-                    'type': str,
-                    'help': '👤 Name of the commit author',
-                },
-                'message': {
-                    'type': str,
-                    'help': '💬 Commit message',
-                },
+    'commit': {
+        'func': 'commit',
+        'args': {
+            **_repo_args,
+            'author': {
+                'type': str,
+                'help': '👤 Name of the commit author',
+            },
+            'message': {
+                'type': str,
+                'help': '💬 Commit message',
             },
-            'help': '✅ Create a new commit',
         },
+        'help': '✅ Create a new commit',
+    },
 
-        'hash_file': {
-            'func': cli_commands.hash_file,
-            'args': {
-                'path': {
-                    'type': str,
-                    'help': '📄 Path of the file to hash',
-                },
-                **_repo_args,
-                'write': {
-                    'type': None,
-                    'help': '💾 Save the file to the repository',
-                    'default': False,
-                    'flag': True,
-                    'short_flag': 'w',
-                },
+    'hash_file': {
+        'func': 'hash_file',
+        'args': {
+            'path': {
+                'type': str,
+                'help': '📄 Path of the file to hash',
+            },
+            **_repo_args,
+            'write': {
+                'type': None,
+                'help': '💾 Save the file to the repository',
+                'default': False,
+                'flag': True,
+                'short_flag': 'w',
             },
-            'help': '🔍 Print the hash of the file and optionally save it to the repository',
         },
+        'help': '🔍 Print the hash of the file and optionally save it to the repository',
+    },
 
-        'add_branch': {
-            'func': cli_commands.add_branch,
-            'args': {
-                **_repo_args,
-                'branch_name': {
-                    'type': str,
-                    'help': '➕ Name of the branch to add',
-                },
+    'add_branch': {
+        'func': 'add_branch',
+        'args': {
+            **_repo_args,
+            'branch_name': {
+                'type': str,
+                'help': '➕ Name of the branch to add',
             },
-            'help': 'Add a new branch',
         },
+        'help': 'Add a new branch',
+    },
 
-        'delete_branch': {
-            'func': cli_commands.delete_branch,
-            'args': {
-                **_repo_args,
-                'branch_name': {
-                    'type': str,
-                    'help': '❌ Name of the branch to remove',
-                },
+    'delete_branch': {
+        'func': 'delete_branch',
+        'args': {
+            **_repo_args,
+            'branch_name': {
+                'type': str,
+                'help': '❌ Name of the branch to remove',
             },
-            'help': '🗑️ Remove an existing branch',
         },
+        'help': '🗑️ Remove an existing branch',
+    },
 
-        'branch_exists': {
-            'func': cli_commands.branch_exists,
-            'args': {
-                **_repo_args,
-                'branch_name': {
-                    'type': str,
-                    'help': '🔍 Name of the branch to check',
-                },
+    'branch_exists': {
+        'func': 'branch_exists',
+        'args': {
+            **_repo_args,
+            'branch_name': {
+                'type': str,
+                'help': '🔍 Name of the branch to check',
             },
-            'help': '❓ Check if a branch exists',
         },
+        'help': '❓ Check if a branch exists',
+    },
 
-        'branch': {
-            'func': cli_commands.branch,
-            'args': {
-                **_repo_args,
-            },
-            'help': '📚 List all branches',
+    'branch': {
+        'func': 'branch',
+        'args': {
+            **_repo_args,
         },
+        'help': '📚 List all branches',
+    },
 
-        'log': {
-            'func': cli_commands.log,
-            'args': {
-                **_repo_args,
-            },
-            'help': '📜 Show commit log',
+    'log': {
+        'func': 'log',
+        'args': {
+            **_repo_args,
         },
+        'help': '📜 Show commit log',
+    },
 
-        'diff': {
-            'func': cli_commands.diff,
-            'args': {
-                **_repo_args,
-                'commit1': {
-                    'type': str,
-                    'help': '🔄 First commit hash to diff',
-                },
-                'commit2': {
-                    'type': str,
-                    'help': '🔄 Second commit hash to diff',
-                },
+    'diff': {
+        'func': 'diff',
+        'args': {
+            **_repo_args,
+            'commit1': {
+                'type': str,
+                'help': '🔄 First commit hash to diff',
+            },
+            'commit2': {
+                'type': str,
+                'help': '🔄 Second commit hash to diff',
             },
-            'help': '📊 Display differences between two commits',
         },
-    }
+        'help': '📊 Display differences between two commits',
+    },
+}
+
+
+def _argument_specs(args: dict[str, dict[str, Any]]) -> list[tuple[tuple[str, ...], dict[str, Any]]]:
+    """Translate a command's argument table into ready-to-use `add_argument` calls.
+
+    :param args: The `args` entry of a command in `_commands`.
+    :return: A list of (positional arguments, keyword arguments) pairs for `add_argument`."""
+    specs: list[tuple[tuple[str, ...], dict[str, Any]]] = []
+
+    for arg_name, arg_info in args.items():
+        arg_type = arg_info['type']
+        arg_help = arg_info['help']
+        arg_default = arg_info.get('default')
+        arg_flag = arg_info.get('flag', False)
+
+        if arg_flag:
+            arg_short_flag = arg_info['short_flag']
+            specs.append(((f'-{arg_short_flag}', f'--{arg_name}'),
+                          {'help': arg_help, 'action': 'store_true', 'default': arg_default}))
+        elif arg_default is not None:
+            specs.append(((f'--{arg_name}',),
+                          {'type': arg_type, 'help': f'{arg_help} (default: %(default)s)', 'default': arg_default}))
+        else:
+            specs.append(((arg_name,), {'type': arg_type, 'help': arg_help}))
+
+    return specs
+
+
+# The argument tables are resolved once at import so registering a subparser is just a series of calls
+_parser_args: dict[str, list[tuple[tuple[str, ...], dict[str, Any]]]] = {
+    command_name: _argument_specs(command_info['args']) for command_name, command_info in _commands.items()
+}
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser(description='CAF Command Line Interface')
+    commands_sub = parser.add_subparsers(title='✨ Available Commands ✨', dest='command',
+                                         help='Choose a command to execute')
+
+    # Only one command ever runs, so register just its subparser when it is named up front.
+    # Help and unknown commands fall back to registering everything so the usage output is complete.
+    selected_command = sys.argv[1] if len(sys.argv) > 1 else None
+    if selected_command in _commands:
+        commands_to_register = {selected_command: _commands[selected_command]}
+    else:
+        commands_to_register = _commands
 
     # Register commands
-    for command_name, command_info in commands.items():
+    for command_name, command_info in commands_to_register.items():
         command_sub = commands_sub.add_parser(command_name, help=command_info['help'])
-        for arg_name, arg_info in command_info['args'].items():
-            arg_type = arg_info['type']
-            arg_help = arg_info['help']
-            arg_default = arg_info.get('default')
-            arg_flag = arg_info.get('flag', False)
-
-            if arg_flag:
-                arg_short_flag = arg_info['short_flag']
-                command_sub.add_argument(f'-{arg_short_flag}', f'--{arg_name}', help=arg_help, action='store_true',
-                                         default=arg_default)
-            elif arg_default is not None:
-                command_sub.add_argument(f'--{arg_name}', type=arg_type, help=f'{arg_help} (default: %(default)s)',
-                                         default=arg_default)
-            else:
-                command_sub.add_argument(arg_name, type=arg_type, help=arg_help)
+        for arg_names, arg_kwargs in _parser_args[command_name]:
+            command_sub.add_argument(*arg_names, **arg_kwargs)
 
     command_args = parser.parse_args()
     if command_args.command is None:
         parser.print_help()
     else:
-        # Call the function associated with the command and exit with its return code
-        command_info = commands[command_args.command]
-        command_func = command_info['func']
+        # Call the function associated with the command and exit with its return code.
+        # The command implementations pull in the rest of libcaf, so they are only imported
+        # once argparse has settled on a command to run.
+        command_info = _commands[command_args.command]
+        command_func = getattr(importlib.import_module('caf.cli_commands'), command_info['func'])
 
         code = command_func(**command_args.__dict__)
         sys.exit(code)
@@ -1,9 +1,11 @@
 """CLI command implementations for CAF (Content Addressable File system)."""
 
 import sys
-from collections.abc import MutableSequence, Sequence
-from datetime import datetime
+import time
+from collections.abc import Callable, MutableSequence, Sequence
+from itertools import chain
 from pathlib import Path
+from typing import Any
 
 from libcaf.constants import DEFAULT_BRANCH
 from libcaf.plumbing import hash_file as plumbing_hash_file
@@ -11,13 +13,18 @@ from libcaf.ref import SymRef
 from libcaf.repository import (AddedDiff, Diff, ModifiedDiff, MovedToDiff, RemovedDiff, Repository, RepositoryError,
                                RepositoryNotFoundError)
 
+_LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+_LOG_SEPARATOR = '-' * 50
 
+
+# The streams are looked up on every call rather than bound once, so that redirecting
+# sys.stdout/sys.stderr (as pytest's capture does) keeps working.
 def _print_error(message: str) -> None:
-    print(f'❌ Error: {message}', file=sys.stderr)
+    sys.stderr.write(f'❌ Error: {message}\n')
 
 
 def _print_success(message: str) -> None:
-    print(message)
+    sys.stdout.write(f'{message}\n')
 
 
 def init(**kwargs) -> int:
@@ -192,22 +199,25 @@ def log(**kwargs) -> int:
     repo = _repo_from_cli_kwargs(kwargs)
 
     try:
-        history = list(repo.log())
-        if not history:
+        # Stream the history so long logs start printing without loading every commit first
+        history = repo.log()
+        first = next(history, None)
+        if first is None:
             _print_success('No commits in the repository.')
             return 0
 
         _print_success('Commit history:\n')
-        for item in history:
+        for item in chain((first,), history):
             commit = item.commit
+            commit_date = time.strftime(_LOG_DATE_FORMAT, time.localtime(commit.timestamp))
+            message = ''.join(f'    {line}\n' for line in commit.message.splitlines())
 
-            print(f'Commit: {item.commit_ref}')
-            print(f'Author: {commit.author}')
-            commit_date = datetime.fromtimestamp(commit.timestamp).strftime('%Y-%m-%d %H:%M:%S')
-            print(f'Date: {commit_date}\n')
-            for line in commit.message.splitlines():
-                print(f'    {line}')
-            print('\n' + '-' * 50 + '\n')
+            # One write per entry rather than one print per line
+            sys.stdout.write(f'Commit: {item.commit_ref}\n'
+                             f'Author: {commit.author}\n'
+                             f'Date: {commit_date}\n\n'
+                             f'{message}'
+                             f'\n{_LOG_SEPARATOR}\n\n')
 
         return 0
     except RepositoryNotFoundError:
@@ -252,26 +262,31 @@ def _repo_from_cli_kwargs(kwargs: dict[str, str]) -> Repository:
     return Repository(working_dir_path, repo_dir)
 
 
+def _format_moved_to(diff: MovedToDiff) -> str:
+    assert diff.moved_to is not None, 'MovedToDiff must have a moved_to record, this is a bug!'
+    return f'Moved: {diff.record.name} -> {diff.moved_to.record.name}'
+
+
+# Output line for each printable diff type, looked up by exact type. MovedFromDiff is the other
+# half of a MovedToDiff, which already prints the move, so it has no entry.
+_diff_formatters: dict[type[Diff], Callable[[Any], str]] = {
+    AddedDiff: lambda diff: f'Added: {diff.record.name}',
+    ModifiedDiff: lambda diff: f'Modified: {diff.record.name}',
+    MovedToDiff: _format_moved_to,
+    RemovedDiff: lambda diff: f'Removed: {diff.record.name}',
+}
+
+
 def _print_diffs(diff_stack: MutableSequence[tuple[Sequence[Diff], int]]) -> None:
     _print_success('Diff:\n')
 
     while diff_stack:
         current_diffs, indent = diff_stack.pop()
+        prefix = ' ' * indent
         for diff in current_diffs:
-            print(' ' * indent, end='')
-
-            match diff:
-                case AddedDiff(record, _, _):
-                    print(f'Added: {record.name}')
-                case ModifiedDiff(record, _, _):
-                    print(f'Modified: {record.name}')
-                case MovedToDiff(record, _, _, moved_to):
-                    assert moved_to is not None, 'MovedToDiff must have a moved_to record, this is a bug!'
-                    print(f'Moved: {record.name} -> {moved_to.record.name}')
-                case RemovedDiff(record, _, _):
-                    print(f'Removed: {record.name}')
-                case _:
-                    pass
+            formatter = _diff_formatters.get(type(diff))
+            if formatter is not None:
+                print(f'{prefix}{formatter(diff)}')
 
             if diff.children:
                 diff_stack.append((diff.children, indent + 3))
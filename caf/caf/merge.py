@@ -1,10 +1,10 @@
-from collections import deque
+import heapq
 from pathlib import Path
 from enum import Enum
 
+from libcaf.commit_graph import CommitGraph
 from libcaf.repository import Repository
-from libcaf.ref import HashRef
-from libcaf.plumbing import load_commit
+from libcaf.ref import HashRef, Ref, RefError
 
 class MergeCase(Enum):
     DISCONNECTED = 'no-common-ancestor'
@@ -12,76 +12,139 @@ class MergeCase(Enum):
     FAST_FORWARD = 'fast-forward'
     THREE_WAY = 'three-way'
 
-def find_common_ancestor(repo_dir: Path, commit_a: HashRef, commit_b: HashRef) -> HashRef | None:
+def _is_ancestor(graph: CommitGraph, ancestor: HashRef, descendant: HashRef) -> bool:
     """
-    Return the lowest common ancestor of two commits, or None if no common ancestor exists.
+    Return True if ancestor is descendant itself or is reachable from it through parents.
+
+    Every ancestor of a commit has a lower generation, so a commit no newer than ancestor is
+    never expanded and the walk stays between the two commits.
     """
-    # Trivial case: identical commits
-    if commit_a == commit_b:
-        return commit_a
-    
-    repo = Repository(repo_dir)
-    objects_dir = repo.objects_dir()
-            
-    # Collect all ancestors of commit_a (including commit_a itself)
-    ancestors_of_a: set[HashRef] = set()
-    stack: list[HashRef] = [commit_a]
-
-    while stack:
-        current = stack.pop()
-        ancestors_of_a.add(current)
-
-        try:
-            commit = load_commit(objects_dir, current)
-        except Exception as e:
-            raise RuntimeError(f"Failed to load commit {current}: {e}") from e
-
-        stack.extend(commit.parents)
-
-    # BFS from commit_b 
-    # This also handles the case where commit_b is an ancestor of commit_a,
-    # since commit_a is already included in ancestors_of_a.
-    queue: deque[HashRef] = deque([commit_b])
+    ancestor_generation = graph.generation(ancestor)
+    queue: list[HashRef] = [descendant]
     visited: set[HashRef] = set()
+    next_index = 0
 
-    while queue:
-        current = queue.popleft()
-        if current not in visited:
-            visited.add(current)
+    while next_index < len(queue):
+        current = queue[next_index]
+        next_index += 1
 
-            if current in ancestors_of_a:
-                return current
+        if current == ancestor:
+            return True
+        if current in visited:
+            continue
+        visited.add(current)
+        if graph.generation(current) <= ancestor_generation:
+            continue
 
-            try:
-                commit = load_commit(objects_dir, current)
-            except Exception as e:
-                raise RuntimeError(f"Failed to load commit {current}: {e}") from e
-            
-            queue.extend(commit.parents)
+        queue.extend(parent for parent in graph.parents(current) if parent not in visited)
 
-    return None    
+    return False
 
-def merge(repo: Repository, target: HashRef) -> MergeCase:
+def find_common_ancestor(commits: CommitGraph | Path, commit_a: HashRef, commit_b: HashRef) -> HashRef | None:
+    """
+    Return the lowest common ancestor of two commits, or None if no common ancestor exists.
+
+    :param commits: The commit graph of the repository holding both commits, such as
+        Repository.commit_graph(), or its objects directory to walk a fresh graph.
+    """
+    graph = commits if isinstance(commits, CommitGraph) else CommitGraph(commits)
+    return _find_common_ancestor(graph, commit_a, commit_b)
+
+# Which tips a commit has been reached from during the merge-base walk
+_FROM_A = 1
+_FROM_B = 2
+_FROM_BOTH = _FROM_A | _FROM_B
+
+def _find_common_ancestor(graph: CommitGraph, commit_a: HashRef, commit_b: HashRef) -> HashRef | None:
+    # Trivial case: identical commits
+    if commit_a == commit_b:
+        return commit_a
+
+    # Histories that start from disjoint sets of root commits cannot meet anywhere. The roots are only
+    # compared when both are known already: working them out walks both histories in full, while the
+    # walk below finds no merge base for disconnected histories all the same
+    roots_a = graph.known_roots(commit_a)
+    roots_b = graph.known_roots(commit_b)
+    if roots_a is not None and roots_b is not None and roots_a.isdisjoint(roots_b):
+        return None
+
+    # Paint commits with the tips they are reachable from, always expanding the commit with the
+    # highest generation next. Every descendant of a commit has a higher generation, so by the
+    # time it is popped it has been painted from all its descendants in the walk. The first commit
+    # popped with both colours is therefore a common ancestor that no other common ancestor
+    # descends from, and everything older is never expanded.
+    def _entry(commit_ref: HashRef) -> tuple[int, int, HashRef]:
+        # heapq is a min-heap; newer commits break generation ties
+        return -graph.generation(commit_ref), -graph.timestamp(commit_ref), commit_ref
+
+    flags: dict[HashRef, int] = {commit_a: _FROM_A, commit_b: _FROM_B}
+    queue = [_entry(commit_a), _entry(commit_b)]
+    heapq.heapify(queue)
+
+    while queue:
+        *_, current = heapq.heappop(queue)
+        current_flags = flags[current]
+        if current_flags == _FROM_BOTH:
+            return current
+
+        for parent in graph.parents(current):
+            parent_flags = flags.get(parent, 0)
+            if parent_flags | current_flags != parent_flags:
+                flags[parent] = parent_flags | current_flags
+                heapq.heappush(queue, _entry(parent))
+
+    return None
+
+# Outcome of a merge keyed by (no merge base, merge base is target, merge base is HEAD)
+_merge_cases: dict[tuple[bool, bool, bool], MergeCase] = {
+    (True, False, False): MergeCase.DISCONNECTED,
+    (False, True, False): MergeCase.UP_TO_DATE,
+    (False, True, True): MergeCase.UP_TO_DATE,
+    (False, False, True): MergeCase.FAST_FORWARD,
+    (False, False, False): MergeCase.THREE_WAY,
+}
+
+def _find_merge_base(graph: CommitGraph, head: HashRef, target: HashRef) -> HashRef | None:
+    # Up-to-date and fast-forward merges only need a walk from one tip until it meets the
+    # other; the full merge-base search is left for histories that actually diverged
+    if head == target or _is_ancestor(graph, target, head):
+        return target
+    if _is_ancestor(graph, head, target):
+        return head
+    return _find_common_ancestor(graph, head, target)
+
+
+def merge(repo: Repository, target: Ref) -> MergeCase:
     """
     Determine and perform the appropriate merge operation between the current HEAD
     of the repository and the given target commit.
 
+    Only fast-forward merges change the repository. Three-way merges are reported but not
+    performed yet, so HEAD is left untouched.
+
+    :param target: The commit to merge, as a commit hash or a reference resolving to one.
     :return: A MergeCase value describing the outcome of the merge decision.
-    :raises NotImplementedError: If a three-way merge is required."""
+    :raises RefError: If the target cannot be resolved to a commit."""
 
+    # Resolve both sides to full commit hashes once, so the traversal and every
+    # comparison below work on plain hashes
     head = repo.head_commit()
-    merge_base = find_common_ancestor(repo.working_dir, head, target)
+    target_ref = repo.resolve_ref(target)
+    if target_ref is None:
+        msg = f'Cannot resolve reference {target}'
+        raise RefError(msg)
+    target = target_ref
+
+    # The graph is kept by the repository, so commits parsed by earlier merges and by the
+    # walks below are all shared
+    graph = repo.commit_graph()
+
+    # Ancestry never changes, so a pair of tips merged before is decided without any walk
+    merge_base = graph.merge_base(head, target, lambda: _find_merge_base(graph, head, target))
 
-    if merge_base == None:
-        return MergeCase.DISCONNECTED
-    
-    elif merge_base == target:
-        return MergeCase.UP_TO_DATE
+    merge_case = _merge_cases[(merge_base is None, merge_base == target, merge_base == head)]
 
-    elif merge_base == head:
-        head_ref = repo.head_ref()
-        repo.update_ref(head_ref, target)
-        return MergeCase.FAST_FORWARD
+    if merge_case is MergeCase.FAST_FORWARD:
+        repo.update_ref(repo.head_ref(), target)
 
-    elif merge_base != head and merge_base != target:
-        raise NotImplementedError("Three-way merge is not implemented yet.")
\ No newline at end of file
+    return merge_case
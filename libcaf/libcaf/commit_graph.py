@@ -0,0 +1,272 @@
+"""Commit ancestry graph shared by history walks."""
+
+import struct
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+from . import Commit
+from .plumbing import load_commit
+
+# One record per commit: the binary commit hash, its timestamp and its generation number
+_GRAPH_RECORD = struct.Struct('<20sqI')
+# One record per commit in the roots file next to the graph file: the binary commit hash and the number of its
+# roots, followed by the binary hashes of the roots
+_ROOTS_HEADER = struct.Struct('<20sI')
+_RAW_HASH_SIZE = 20
+# Merge bases remembered per graph, least recently used first out
+_MERGE_BASE_CACHE_SIZE = 1024
+
+
+class CommitGraph:
+    """The parents, timestamps and generation numbers of the commits in a repository.
+
+    Commits are read from the objects directory the first time they are needed and kept, so history walks
+    that reach the same commits again, within one walk or across several, parse each commit only once.
+
+    A root commit has generation 1 and any other commit one more than its highest parent, so a commit's
+    generation is greater than that of every one of its ancestors. The roots of a commit are the root
+    commits its history starts from; two commits share an ancestor exactly when they share a root.
+
+    Given a graph file, the timestamps and generation numbers recorded there by earlier processes are
+    loaded up front, along with the roots recorded in the roots file next to it, and commits passed to
+    `store` are appended to both."""
+
+    def __init__(self, objects_dir: Path, graph_file: Path | None = None) -> None:
+        """Create a graph over a repository's objects directory.
+
+        :param objects_dir: The objects directory commits are loaded from.
+        :param graph_file: The append-only file generation numbers are persisted in, if any.
+            A missing or unreadable file is treated as empty."""
+        self.objects_dir = objects_dir
+        self.graph_file = graph_file
+        self.roots_file = graph_file.with_name(f'{graph_file.name}_roots') if graph_file is not None else None
+        self._parents: dict[str, list[str]] = {}
+        self._timestamps: dict[str, int] = {}
+        self._generations: dict[str, int] = {}
+        self._roots: dict[str, frozenset[str]] = {}
+        self._stored: set[str] = set()
+
+        if graph_file is not None:
+            self._read_graph_file(graph_file)
+            self._read_roots_file(self.roots_file)
+
+        # Merge bases already found, keyed by the ordered pair of tips. Commits never change, so neither
+        # does their ancestry, and the entries never go stale; only the number kept is bounded.
+        self._merge_bases: OrderedDict[tuple[str, str], str | None] = OrderedDict()
+
+    def add(self, commit_ref: str, commit: Commit) -> None:
+        """Add a commit whose object is already at hand, such as one that was just saved.
+
+        If the generation numbers and roots of all its parents are known, the commit's own are filled in
+        from them, so a commit made on top of known history never needs a walk.
+
+        :param commit_ref: The hash of the commit.
+        :param commit: The commit itself."""
+        parents = commit.parents
+        self._parents[commit_ref] = parents
+        self._timestamps[commit_ref] = commit.timestamp
+
+        if commit_ref in self._roots or not all(parent in self._roots for parent in parents):
+            return
+
+        self._generations[commit_ref] = 1 + max((self._generations[parent] for parent in parents), default=0)
+        self._roots[commit_ref] = self._roots_from_parents(commit_ref, parents)
+
+    def store(self, commit_ref: str) -> None:
+        """Append a commit's timestamp and generation number to the graph file, and its roots to the roots file.
+
+        Does nothing if the graph has no file, the commit is already recorded in it, or its timestamp and
+        generation number are not known yet, as when its parents' generations are unknown. Working them out
+        would mean reading the commit's history, so the commit is simply left out of the file.
+
+        :param commit_ref: The hash of the commit."""
+        if self.graph_file is None or commit_ref in self._stored:
+            return
+
+        timestamp = self._timestamps.get(commit_ref)
+        generation = self._generations.get(commit_ref)
+        if timestamp is None or generation is None:
+            return
+
+        record = _GRAPH_RECORD.pack(bytes.fromhex(commit_ref), timestamp, generation)
+        with self.graph_file.open('ab') as f:
+            f.write(record)
+
+        self._stored.add(commit_ref)
+
+        roots = self._roots.get(commit_ref)
+        if roots is not None:
+            roots_record = _ROOTS_HEADER.pack(bytes.fromhex(commit_ref), len(roots))
+            roots_record += b''.join(bytes.fromhex(root) for root in sorted(roots))
+            with self.roots_file.open('ab') as f:
+                f.write(roots_record)
+
+    def parents(self, commit_ref: str) -> list[str]:
+        """Get the parents of a commit.
+
+        :param commit_ref: The hash of the commit.
+        :return: The hashes of the commit's parents.
+        :raises RuntimeError: If the commit cannot be loaded."""
+        parents = self._parents.get(commit_ref)
+        if parents is None:
+            self._load(commit_ref)
+            parents = self._parents[commit_ref]
+
+        return parents
+
+    def timestamp(self, commit_ref: str) -> int:
+        """Get the timestamp of a commit.
+
+        :param commit_ref: The hash of the commit.
+        :return: The commit's timestamp.
+        :raises RuntimeError: If the commit cannot be loaded."""
+        timestamp = self._timestamps.get(commit_ref)
+        if timestamp is None:
+            self._load(commit_ref)
+            timestamp = self._timestamps[commit_ref]
+
+        return timestamp
+
+    def generation(self, commit_ref: str) -> int:
+        """Get the generation number of a commit.
+
+        :param commit_ref: The hash of the commit.
+        :return: The commit's generation number.
+        :raises RuntimeError: If the commit or one of its ancestors cannot be loaded."""
+        generation = self._generations.get(commit_ref)
+        if generation is None:
+            # A new commit usually has parents whose generations are already known, possibly from the
+            # graph file, in which case there is no history to walk
+            parents = self.parents(commit_ref)
+            parent_generations = [gen for parent in parents if (gen := self._generations.get(parent)) is not None]
+            if len(parent_generations) < len(parents):
+                self._index_history(commit_ref)
+                generation = self._generations[commit_ref]
+            else:
+                generation = 1 + max(parent_generations, default=0)
+                self._generations[commit_ref] = generation
+
+        return generation
+
+    def roots(self, commit_ref: str) -> frozenset[str]:
+        """Get the root commits a commit's history starts from.
+
+        :param commit_ref: The hash of the commit.
+        :return: The hashes of the parentless ancestors of the commit, or the commit itself if it is a root.
+        :raises RuntimeError: If the commit or one of its ancestors cannot be loaded."""
+        roots = self._roots.get(commit_ref)
+        if roots is None:
+            self._index_history(commit_ref)
+            roots = self._roots[commit_ref]
+
+        return roots
+
+    def known_roots(self, commit_ref: str) -> frozenset[str] | None:
+        """Get the root commits a commit's history starts from, if they are known without walking the history.
+
+        :param commit_ref: The hash of the commit.
+        :return: The hashes of the parentless ancestors of the commit, or None if they are not known yet."""
+        return self._roots.get(commit_ref)
+
+    def merge_base(self, head: str, target: str, find: Callable[[], str | None]) -> str | None:
+        """Get the merge base of two tips, finding it only if it is not remembered from an earlier call.
+
+        :param head: The hash of the commit being merged into.
+        :param target: The hash of the commit being merged.
+        :param find: Finds the merge base of the two tips.
+        :return: The hash of the merge base, or None if the tips have no common ancestor."""
+        key = (head, target)
+        if key in self._merge_bases:
+            self._merge_bases.move_to_end(key)
+            return self._merge_bases[key]
+
+        merge_base = self._merge_bases[key] = find()
+        if len(self._merge_bases) > _MERGE_BASE_CACHE_SIZE:
+            self._merge_bases.popitem(last=False)
+
+        return merge_base
+
+    def _index_history(self, commit_ref: str) -> None:
+        # Compute the generation and roots of a commit and of every ancestor still lacking them,
+        # parents first, without recursing. Generations read from the graph file come without roots,
+        # so it is the roots that mark a commit as done.
+        generations = self._generations
+        all_roots = self._roots
+        stack = [commit_ref]
+
+        while stack:
+            current = stack[-1]
+            if current in all_roots:
+                stack.pop()
+                continue
+
+            parents = self.parents(current)
+            missing = [parent for parent in parents if parent not in all_roots]
+            if missing:
+                stack.extend(missing)
+                continue
+
+            generations[current] = 1 + max((generations[parent] for parent in parents), default=0)
+            all_roots[current] = self._roots_from_parents(current, parents)
+
+            stack.pop()
+
+    def _roots_from_parents(self, commit_ref: str, parents: list[str]) -> frozenset[str]:
+        if not parents:
+            return frozenset((commit_ref,))
+
+        # Most histories have a single root, so parents usually share one roots set object
+        roots = self._roots[parents[0]]
+        for parent in parents[1:]:
+            parent_roots = self._roots[parent]
+            if parent_roots is not roots and not parent_roots <= roots:
+                roots |= parent_roots
+
+        return roots
+
+    def _load(self, commit_ref: str) -> None:
+        try:
+            commit = load_commit(self.objects_dir, commit_ref)
+        except Exception as e:
+            msg = f'Failed to load commit {commit_ref}: {e}'
+            raise RuntimeError(msg) from e
+
+        self.add(commit_ref, commit)
+
+    def _read_graph_file(self, graph_file: Path) -> None:
+        try:
+            data = graph_file.read_bytes()
+        except OSError:
+            return
+
+        # A record cut short by an interrupted append is ignored
+        end = len(data) - len(data) % _GRAPH_RECORD.size
+        for raw_hash, timestamp, generation in _GRAPH_RECORD.iter_unpack(data[:end]):
+            commit_ref = raw_hash.hex()
+            self._timestamps[commit_ref] = timestamp
+            self._generations[commit_ref] = generation
+            self._stored.add(commit_ref)
+
+    def _read_roots_file(self, roots_file: Path) -> None:
+        try:
+            data = roots_file.read_bytes()
+        except OSError:
+            return
+
+        # Identical root sets share one object, as they do when computed. Roots are only taken for commits
+        # whose generation is known too, which the history walks expect of every commit with roots, and a
+        # record cut short by an interrupted append ends the file.
+        shared_roots: dict[frozenset[str], frozenset[str]] = {}
+        offset = 0
+        while offset + _ROOTS_HEADER.size <= len(data):
+            raw_hash, count = _ROOTS_HEADER.unpack_from(data, offset)
+            start = offset + _ROOTS_HEADER.size
+            offset = start + count * _RAW_HASH_SIZE
+            if offset > len(data):
+                break
+
+            commit_ref = raw_hash.hex()
+            if commit_ref in self._generations:
+                roots = frozenset(data[i:i + _RAW_HASH_SIZE].hex() for i in range(start, offset, _RAW_HASH_SIZE))
+                self._roots[commit_ref] = shared_roots.setdefault(roots, roots)
@@ -5,6 +5,8 @@ from _libcaf import hash_length
 DEFAULT_REPO_DIR = '.caf'
 OBJECTS_SUBDIR = 'objects'
 HEAD_FILE = 'HEAD'
+HASH_CACHE_FILE = 'hash_cache'
+COMMIT_GRAPH_FILE = 'commit_graph'
 DEFAULT_BRANCH = 'main'
 REFS_DIR = 'refs'
 HEADS_DIR = 'heads'
@@ -1,56 +1,126 @@
 from __future__ import annotations
 
+import os
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from pathlib import Path
-from collections import deque
 
 from libcaf import Tree, TreeRecord, TreeRecordType
+from .hash_cache import HashCache
 from .plumbing import hash_file, hash_object
 
+# Files and subdirectories of a directory, in directory order. Tree keeps its records ordered by name
+# no matter how they are inserted, so listings are never sorted here.
+_DirListing = tuple[list[os.DirEntry[str]], list[os.DirEntry[str]]]
 
-def build_tree_from_fs(root: Path, repo_dir_name: str) -> tuple[Tree, str, dict[str, Tree]]:
-    if not root.exists() or not root.is_dir():
-        raise NotADirectoryError(str(root))
 
-    trees_by_path: dict[Path, Tree] = {}
-    hashes_by_path: dict[Path, str] = {}
-    subtrees_by_hash: dict[str, Tree] = {}
+class _FsTreeBuilder:
+    """Builds the tree of a directory without saving anything.
 
-    def _build_dir_tree(dir_path: Path) -> tuple[Tree, str]:
-        records: dict[str, TreeRecord] = {}
+    Files are hashed on the executor while the walk goes on, unless the hash cache already knows their hash, and hard
+    links to one inode are hashed once."""
+
+    def __init__(self, repo_dir_name: str, hash_cache: HashCache | None, executor: Executor) -> None:
+        self._repo_dir_name = repo_dir_name
+        self._hash_cache = hash_cache
+        self._executor = executor
+        self.hashes_by_path: dict[str, str] = {}
+        self.subtrees_by_hash: dict[str, Tree] = {}
+        self._cached_hashes_by_path: dict[str, str] = {}
+        self._blob_hashes_by_path: dict[str, Future[str]] = {}
+        # Hard links share one inode, so their content only needs hashing once
+        self._blob_hashes_by_inode: dict[tuple[int, int], Future[str]] = {}
+
+    def build(self, root_path: str) -> Tree:
+        # Post-order walk: a directory is listed once when first popped, then pushed back together
+        # with its listing underneath its subdirectories, and built once they all have hashes
+        root_tree: Tree | None = None
+        stack: list[tuple[str, _DirListing | None]] = [(root_path, None)]
+
+        while stack:
+            dir_path, listing = stack.pop()
+
+            if listing is None:
+                listing = self._scan_dir(dir_path)
+
+                stack.append((dir_path, listing))
+                stack.extend((entry.path, None) for entry in reversed(listing[1]))
+            else:
+                tree, tree_hash = self._build_dir_tree(listing)
+
+                self.hashes_by_path[dir_path] = tree_hash
+                self.subtrees_by_hash[tree_hash] = tree
+                if dir_path == root_path:
+                    root_tree = tree
+
+        return root_tree
+
+    def _start_file_hash(self, entry: os.DirEntry[str]) -> None:
+        cached_hash = self._hash_cache.lookup(entry) if self._hash_cache is not None else None
+        if cached_hash is not None:
+            self._cached_hashes_by_path[entry.path] = cached_hash
+            return
 
-        for item in sorted(dir_path.iterdir(), key=lambda p: p.name):
-            if item.name == repo_dir_name:
-                continue
+        # Start hashing right away; the result is only needed once the directory is built
+        st = entry.stat()
+        if st.st_nlink == 1:
+            self._blob_hashes_by_path[entry.path] = self._executor.submit(hash_file, entry.path)
+            return
 
-            if item.is_file():
-                blob_hash = hash_file(item)
-                records[item.name] = TreeRecord(TreeRecordType.BLOB, blob_hash, item.name)
+        inode = (st.st_dev, st.st_ino)
+        blob_hash = self._blob_hashes_by_inode.get(inode)
+        if blob_hash is None:
+            blob_hash = self._blob_hashes_by_inode[inode] = self._executor.submit(hash_file, entry.path)
+        self._blob_hashes_by_path[entry.path] = blob_hash
 
-            elif item.is_dir():
-                subtree_hash = hashes_by_path[item]
-                records[item.name] = TreeRecord(TreeRecordType.TREE, subtree_hash, item.name)
+    def _file_hash(self, entry: os.DirEntry[str]) -> str:
+        blob_hash = self._cached_hashes_by_path.pop(entry.path, None)
+        if blob_hash is None:
+            blob_hash = self._blob_hashes_by_path.pop(entry.path).result()
+        return blob_hash
+
+    def _scan_dir(self, dir_path: str) -> _DirListing:
+        # DirEntry types come from the directory read itself, so classifying entries does not
+        # stat them (except symlinks, which are followed)
+        files: list[os.DirEntry[str]] = []
+        subdirs: list[os.DirEntry[str]] = []
+
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                if entry.name == self._repo_dir_name:
+                    continue
+                if entry.is_file():
+                    files.append(entry)
+                    self._start_file_hash(entry)
+                elif entry.is_dir():
+                    subdirs.append(entry)
+
+        return files, subdirs
+
+    def _build_dir_tree(self, listing: _DirListing) -> tuple[Tree, str]:
+        files, subdirs = listing
+        records: dict[str, TreeRecord] = {}
+
+        for entry in files:
+            records[entry.name] = TreeRecord(TreeRecordType.BLOB, self._file_hash(entry), entry.name)
+
+        for entry in subdirs:
+            subtree_hash = self.hashes_by_path.pop(entry.path)
+            records[entry.name] = TreeRecord(TreeRecordType.TREE, subtree_hash, entry.name)
 
         tree = Tree(records)
         tree_hash = hash_object(tree)
         return tree, tree_hash
 
-    stack: deque[tuple[Path, bool]] = deque([(root, False)])
 
-    while stack:
-        dir_path, expanded = stack.pop()
+def build_tree_from_fs(root: Path, repo_dir_name: str,
+                       hash_cache: HashCache | None = None) -> tuple[Tree, str, dict[str, Tree]]:
+    if not root.is_dir():
+        raise NotADirectoryError(str(root))
 
-        if expanded:
-            tree, tree_hash = _build_dir_tree(dir_path)
+    root_path = os.fspath(root.absolute())
 
-            trees_by_path[dir_path] = tree
-            hashes_by_path[dir_path] = tree_hash
-            subtrees_by_hash[tree_hash] = tree
-        else:
-            stack.append((dir_path, True))
-            for item in reversed(sorted(dir_path.iterdir(), key=lambda p: p.name)):
-                if item.name == repo_dir_name:
-                    continue
-                if item.is_dir():
-                    stack.append((item, False))
+    with ThreadPoolExecutor() as executor:
+        builder = _FsTreeBuilder(repo_dir_name, hash_cache, executor)
+        root_tree = builder.build(root_path)
 
-    return trees_by_path[root], hashes_by_path[root], subtrees_by_hash
\ No newline at end of file
+    return root_tree, builder.hashes_by_path[root_path], builder.subtrees_by_hash
@@ -0,0 +1,86 @@
+"""Persistent cache of file hashes keyed by their stat signature."""
+
+import json
+import os
+from pathlib import Path
+
+# path -> [st_mtime_ns, st_size, st_ino, hash]
+_CacheEntries = dict[str, list[int | str]]
+
+
+class HashCache:
+    """Remembers the hash of every file saved to the repository so unchanged files need not be re-read.
+
+    A file is considered unchanged when its modification time, size and inode all match the recorded ones.
+    Every recorded hash belongs to a blob that was saved to the objects directory, though the blob may have been
+    deleted since, so callers that rely on the blob check it still exists."""
+
+    def __init__(self, cache_file: Path) -> None:
+        """Create a cache backed by a file, which is only read on first use.
+
+        An operation that never consults the cache does not pay for parsing it. A missing or unreadable cache file
+        yields an empty cache.
+
+        :param cache_file: The path of the cache file inside the repository directory."""
+        self.cache_file = cache_file
+        self._entries: _CacheEntries | None = None
+        self._written_ns = 0
+        self._seen: set[str] = set()
+
+    def _load(self) -> _CacheEntries:
+        if self._entries is None:
+            try:
+                with self.cache_file.open() as f:
+                    self._written_ns = os.fstat(f.fileno()).st_mtime_ns
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+        return self._entries
+
+    def lookup(self, entry: os.DirEntry[str]) -> str | None:
+        """Get the recorded hash of a file if it has not changed since it was recorded.
+
+        :param entry: The directory entry of the file.
+        :return: The recorded hash, or None if the file is unknown or may have changed."""
+        self._seen.add(entry.path)
+        cached = self._load().get(entry.path)
+        if cached is None:
+            return None
+
+        st = entry.stat()
+        mtime_ns, size, ino, file_hash = cached
+        # A file modified within the same timestamp tick the cache was written in could have changed
+        # without its mtime moving, so such entries are never trusted.
+        if mtime_ns >= self._written_ns or (mtime_ns, size, ino) != (st.st_mtime_ns, st.st_size, st.st_ino):
+            return None
+
+        return file_hash
+
+    def record(self, entry: os.DirEntry[str], file_hash: str) -> None:
+        """Record the hash of a file that has been saved to the repository.
+
+        :param entry: The directory entry of the file.
+        :param file_hash: The hash of the file's content."""
+        st = entry.stat()
+        self._seen.add(entry.path)
+        self._load()[entry.path] = [st.st_mtime_ns, st.st_size, st.st_ino, file_hash]
+
+    def prune(self, root_path: str) -> None:
+        """Forget the files under a directory that were neither looked up nor recorded since the cache was loaded.
+
+        Call this after walking the whole directory, so entries of files that no longer exist do not pile up.
+
+        :param root_path: The path of the walked directory, as used for its entries."""
+        prefix = root_path.rstrip(os.sep) + os.sep
+        entries = self._load()
+        for path in [path for path in entries if path.startswith(prefix) and path not in self._seen]:
+            del entries[path]
+
+    def save(self) -> None:
+        """Write the cache back to disk."""
+        tmp_file = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        with tmp_file.open('w') as f:
+            json.dump(self._load(), f, separators=(',', ':'))
+
+        tmp_file.replace(self.cache_file)
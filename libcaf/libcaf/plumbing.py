@@ -37,6 +37,13 @@ def open_content_for_writing(root_dir: str | Path, hash_value: str) -> IO[bytes]
     return os.fdopen(fd, 'wb')
 
 
+def content_exists(root_dir: str | Path, hash_value: str) -> bool:
+    if isinstance(root_dir, Path):
+        root_dir = str(root_dir)
+
+    return _libcaf.content_exists(root_dir, hash_value)
+
+
 def delete_content(root_dir: str | Path, hash_value: str) -> None:
     if isinstance(root_dir, Path):
         root_dir = str(root_dir)
@@ -83,6 +90,7 @@ def load_tree(root_dir: str | Path, hash_value: str) -> Tree:
 
 
 __all__ = [
+    'content_exists',
     'delete_content',
     'hash_file',
     'hash_object',
@@ -1,9 +1,23 @@
 """Reference objects and operations."""
 
+import re
+import time
 from pathlib import Path
 
 from .constants import HASH_CHARSET, HASH_LENGTH
 
+# Matches a full-length hash in one C-level scan instead of a per-character membership loop
+_is_hash = re.compile(f'[{re.escape(HASH_CHARSET)}]{{{HASH_LENGTH}}}').fullmatch
+
+# Parsed ref files by device and inode, so every path that leads to a file shares one entry, along with the
+# mtime and size they were read at. HEAD and branch files are re-read many times per command, and a stat is
+# cheaper than opening and parsing them again.
+_REF_CACHE_SIZE = 256
+_ref_cache: dict[tuple[int, int], tuple[tuple[int, int], 'Ref | None']] = {}
+# A file can be rewritten without its mtime moving while the clock is still within its timestamp tick, so files
+# modified less than this long before they are read, which covers the coarsest file system timestamps, are
+# never cached.
+_RACY_MTIME_NS = 2_000_000_000
 
 class RefError(Exception):
     """Exception raised for reference-related errors."""
@@ -28,12 +42,39 @@ class SymRef(str):
 Ref = HashRef | SymRef | str
 
 
+def is_hash(value: str) -> bool:
+    """Check whether a string is a well-formed hash.
+
+    :param value: The string to check
+    :return: True if the string has the hash length and only hash characters, False otherwise"""
+    return _is_hash(value) is not None
+
+
 def read_ref(ref_file: Path) -> Ref | None:
     """Read a reference from a file.
 
     :param ref_file: Path to the reference file
     :return: A Ref object (HashRef or SymRef) or None if the file is empty
     :raises RefError: If the reference format is invalid"""
+    read_ns = time.time_ns()
+    st = ref_file.stat()
+    key = (st.st_dev, st.st_ino)
+    signature = (st.st_mtime_ns, st.st_size)
+
+    cached = _ref_cache.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    ref = _parse_ref(ref_file)
+
+    if st.st_mtime_ns < read_ns - _RACY_MTIME_NS:
+        if len(_ref_cache) >= _REF_CACHE_SIZE:
+            _ref_cache.clear()
+        _ref_cache[key] = (signature, ref)
+
+    return ref
+
+def _parse_ref(ref_file: Path) -> Ref | None:
     with ref_file.open() as f:
         content = f.read().strip()
 
@@ -43,7 +84,7 @@ def read_ref(ref_file: Path) -> Ref | None:
         if not content:
             return None
 
-        if len(content) == HASH_LENGTH and all(c in HASH_CHARSET for c in content):
+        if _is_hash(content):
             return HashRef(content)
 
         msg = f'Invalid reference format in ref file {ref_file}!'
@@ -56,6 +97,13 @@ def write_ref(ref_file: Path, ref: Ref) -> None:
     :param ref_file: Path to the reference file
     :param ref: Reference to write (HashRef or SymRef)
     :raises RefError: If the reference type is invalid"""
+    try:
+        st = ref_file.stat()
+    except OSError:
+        pass
+    else:
+        _ref_cache.pop((st.st_dev, st.st_ino), None)
+
     with ref_file.open('w') as f:
         match ref:
             case HashRef():
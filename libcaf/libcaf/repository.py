@@ -1,20 +1,142 @@
 """libcaf repository management."""
 
+import os
 import shutil
-from collections import deque
 from collections.abc import Callable, Generator, Sequence
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from functools import wraps
+from functools import lru_cache, partial, wraps
 from pathlib import Path
 from typing import Concatenate
 from pathlib import Path
+from .commit_graph import CommitGraph
 from .fs_tree import build_tree_from_fs
 from . import Blob, Commit, Tree, TreeRecord, TreeRecordType
-from .constants import (DEFAULT_BRANCH, DEFAULT_REPO_DIR, HASH_CHARSET, HASH_LENGTH, HEADS_DIR, HEAD_FILE,
+from .constants import (COMMIT_GRAPH_FILE, DEFAULT_BRANCH, DEFAULT_REPO_DIR, HASH_CACHE_FILE, HEADS_DIR, HEAD_FILE,
                         OBJECTS_SUBDIR, REFS_DIR)
-from .plumbing import hash_object, load_commit, load_tree, save_commit, save_file_content, save_tree, open_content_for_reading
-from .ref import HashRef, Ref, RefError, SymRef, read_ref, write_ref
+from .hash_cache import HashCache
+from .plumbing import (content_exists, hash_object, load_commit, load_tree,
+                       open_content_for_reading, save_commit, save_file_content, save_tree)
+from .ref import HashRef, Ref, RefError, SymRef, is_hash, read_ref, write_ref
+
+
+# Loaded commits and trees kept per repository
+_OBJECT_CACHE_SIZE = 4096
+
+# Files of a directory with their blob hash, or the pending save that produces it, and its subdirectories with
+# their reused tree hash, or None when they are walked
+_DirListing = tuple[list[tuple[os.DirEntry[str], str | Future[Blob]]], list[tuple[os.DirEntry[str], str | None]]]
+
+
+class _DirSaver:
+    """Saves a directory tree to the objects directory, optionally reusing the unchanged parts of a previous save.
+
+    The walk is post-order: a directory is listed once when first popped, then pushed back with its listing
+    underneath its subdirectories, and saved once they all have hashes. Directory entries carry their type from the
+    directory read, so they are classified without a stat per entry. A directory with a previous tree reuses the
+    records of entries that are neither dirty nor contain a dirty path, and one without is saved in full."""
+
+    def __init__(self, objects_dir: Path, repo_dir_name: str, hash_cache: HashCache | None, executor: Executor,
+                 load_tree: Callable[[str], Tree]) -> None:
+        self._objects_dir = objects_dir
+        self._repo_dir_name = repo_dir_name
+        self._hash_cache = hash_cache
+        self._executor = executor
+        self._load_tree = load_tree
+        self._dirty: set[str] = set()
+        self._dirty_parents: set[str] = set()
+        self._hashes: dict[str, str] = {}
+        # Hard links share their content, so each inode is saved once
+        self._blobs_by_inode: dict[tuple[int, int], Future[Blob]] = {}
+
+    def save(self, root_path: str, previous_tree: Tree | None, dirty: set[str], dirty_parents: set[str]) -> str:
+        self._dirty = dirty
+        self._dirty_parents = dirty_parents
+        stack: list[tuple[str, Tree | None, _DirListing | None]] = [(root_path, previous_tree, None)]
+
+        while stack:
+            dir_path, dir_previous_tree, listing = stack.pop()
+
+            if listing is None:
+                listing, subdirs_to_walk = self._scan_dir(dir_path, dir_previous_tree)
+                stack.append((dir_path, None, listing))
+                stack.extend((subdir_path, subtree, None) for subdir_path, subtree in subdirs_to_walk)
+            else:
+                self._hashes[dir_path] = self._build_dir_tree(listing)
+
+        return self._hashes[root_path]
+
+    def _previous_record(self, entry: os.DirEntry[str], previous_tree: Tree | None,
+                         record_type: TreeRecordType) -> TreeRecord | None:
+        record = previous_tree.records.get(entry.name) if previous_tree is not None else None
+        if record is None or record.type != record_type or entry.path in self._dirty:
+            return None
+        return record
+
+    def _save_blob(self, entry: os.DirEntry[str]) -> str | Future[Blob]:
+        # Files that have not changed since they were last saved are already in the objects dir,
+        # unless their blob has been deleted since; the others start saving right away
+        blob_hash = self._hash_cache.lookup(entry) if self._hash_cache is not None else None
+        if blob_hash is not None and content_exists(self._objects_dir, blob_hash):
+            return blob_hash
+
+        # DirEntry keeps its stat, so this is the same one the hash cache took and records later
+        st = entry.stat()
+        if st.st_nlink == 1:
+            return self._executor.submit(save_file_content, self._objects_dir, entry.path)
+
+        inode = (st.st_dev, st.st_ino)
+        blob = self._blobs_by_inode.get(inode)
+        if blob is None:
+            blob = self._executor.submit(save_file_content, self._objects_dir, entry.path)
+            self._blobs_by_inode[inode] = blob
+
+        return blob
+
+    def _scan_dir(self, dir_path: str, previous_tree: Tree | None) -> tuple[_DirListing, list[tuple[str, Tree | None]]]:
+        files: list[tuple[os.DirEntry[str], str | Future[Blob]]] = []
+        subdirs: list[tuple[os.DirEntry[str], str | None]] = []
+        subdirs_to_walk: list[tuple[str, Tree | None]] = []
+
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.name == self._repo_dir_name:
+                    continue
+                if entry.is_file():
+                    record = self._previous_record(entry, previous_tree, TreeRecordType.BLOB)
+                    files.append((entry, record.hash if record is not None else self._save_blob(entry)))
+                elif entry.is_dir():
+                    record = self._previous_record(entry, previous_tree, TreeRecordType.TREE)
+                    if record is not None and entry.path not in self._dirty_parents:
+                        subdirs.append((entry, record.hash))
+                    else:
+                        subdirs.append((entry, None))
+                        previous_subtree = self._load_tree(record.hash) if record is not None else None
+                        subdirs_to_walk.append((entry.path, previous_subtree))
+
+        return (files, subdirs), subdirs_to_walk
+
+    def _build_dir_tree(self, listing: _DirListing) -> str:
+        files, subdirs = listing
+        tree_records: dict[str, TreeRecord] = {}
+
+        for entry, blob in files:
+            if isinstance(blob, Future):
+                blob_hash = blob.result().hash
+                if self._hash_cache is not None:
+                    self._hash_cache.record(entry, blob_hash)
+            else:
+                blob_hash = blob
+            tree_records[entry.name] = TreeRecord(TreeRecordType.BLOB, blob_hash, entry.name)
+
+        for entry, subtree_hash in subdirs:
+            tree_hash = subtree_hash if subtree_hash is not None else self._hashes.pop(entry.path)
+            tree_records[entry.name] = TreeRecord(TreeRecordType.TREE, tree_hash, entry.name)
+
+        tree = Tree(tree_records)
+        save_tree(self._objects_dir, tree)
+        return hash_object(tree)
 
 
 class RepositoryError(Exception):
@@ -25,7 +147,7 @@ class RepositoryNotFoundError(RepositoryError):
     """Exception raised when a repository is not found."""
 
 
-@dataclass
+@dataclass(slots=True)
 class Diff:
     """A class representing a difference between two tree records."""
 
@@ -34,36 +156,36 @@ class Diff:
     children: list['Diff']
 
 
-@dataclass
+@dataclass(slots=True)
 class AddedDiff(Diff):
     """An added tree record diff as part of a commit."""
 
 
-@dataclass
+@dataclass(slots=True)
 class RemovedDiff(Diff):
     """A removed tree record diff as part of a commit."""
 
 
-@dataclass
+@dataclass(slots=True)
 class ModifiedDiff(Diff):
     """A modified tree record diff as part of a commit."""
 
 
-@dataclass
+@dataclass(slots=True)
 class MovedToDiff(Diff):
     """A tree record diff that has been moved elsewhere as part of a commit."""
 
     moved_to: 'MovedFromDiff | None'
 
 
-@dataclass
+@dataclass(slots=True)
 class MovedFromDiff(Diff):
     """A tree record diff that has been moved from elsewhere as part of a commit."""
 
     moved_from: MovedToDiff | None
 
 
-@dataclass
+@dataclass(slots=True)
 class LogEntry:
     """A class representing a log entry for a branch or commit history."""
 
@@ -89,12 +211,26 @@ class Repository:
         else:
             self.repo_dir = Path(repo_dir)
 
+        # The repository layout is fixed once the working and repository directories are known,
+        # so its paths are built here once rather than on every access
+        self._repo_path = self.working_dir / self.repo_dir
+        self._objects_dir = self._repo_path / OBJECTS_SUBDIR
+        self._refs_dir = self._repo_path / REFS_DIR
+        self._heads_dir = self._refs_dir / HEADS_DIR
+        self._head_file = self._repo_path / HEAD_FILE
+        self._hash_cache_file = self._repo_path / HASH_CACHE_FILE
+        self._commit_graph_file = self._repo_path / COMMIT_GRAPH_FILE
+
+        self._commit_graph: CommitGraph | None = None
+        self._forget_loaded_objects()
+
     def init(self, default_branch: str = DEFAULT_BRANCH) -> None:
         """Initialize a new CAF repository in the working directory.
 
         :param default_branch: The name of the default branch to create. Defaults to 'main'.
         :raises RepositoryError: If the repository already exists or if the working directory is invalid."""
         self.repo_path().mkdir(parents=True)
+        self._forget_loaded_objects()
         self.objects_dir().mkdir()
 
         heads_dir = self.heads_dir()
@@ -110,29 +246,37 @@ class Repository:
         :return: True if the repository exists, False otherwise."""
         return self.repo_path().exists()
 
+    def _forget_loaded_objects(self) -> None:
+        # Saved objects never change, so loaded commits and trees are kept for the lifetime of this instance,
+        # until it deletes or re-creates the repository. A repository removed or rewritten behind its back,
+        # e.g. by another process, needs a new Repository instance.
+        self._load_commit = lru_cache(maxsize=_OBJECT_CACHE_SIZE)(partial(load_commit, self._objects_dir))
+        self._load_tree = lru_cache(maxsize=_OBJECT_CACHE_SIZE)(partial(load_tree, self._objects_dir))
+        self._commit_graph = None
+
     def repo_path(self) -> Path:
         """Get the path to the repository directory.
 
         :return: The path to the repository directory."""
-        return self.working_dir / self.repo_dir
+        return self._repo_path
 
     def objects_dir(self) -> Path:
         """Get the path to the objects directory within the repository.
 
         :return: The path to the objects directory."""
-        return self.repo_path() / OBJECTS_SUBDIR
+        return self._objects_dir
 
     def refs_dir(self) -> Path:
         """Get the path to the refs directory within the repository.
 
         :return: The path to the refs directory."""
-        return self.repo_path() / REFS_DIR
+        return self._refs_dir
 
     def heads_dir(self) -> Path:
         """Get the path to the heads directory within the repository.
 
         :return: The path to the heads directory."""
-        return self.refs_dir() / HEADS_DIR
+        return self._heads_dir
 
     @staticmethod
     def requires_repo[**P, R](func: Callable[Concatenate['Repository', P], R]) -> \
@@ -159,12 +303,12 @@ class Repository:
         :return: The current HEAD reference, which can be a HashRef or SymRef.
         :raises RepositoryError: If the HEAD ref file does not exist.
         :raises RepositoryNotFoundError: If the repository does not exist."""
-        head_file = self.head_file()
-        if not head_file.exists():
+        # Read straight away rather than checking for the file first; a missing file shows up as the error
+        try:
+            return read_ref(self.head_file())
+        except FileNotFoundError as e:
             msg = 'HEAD ref file does not exist'
-            raise RepositoryError(msg)
-
-        return read_ref(head_file)
+            raise RepositoryError(msg) from e
 
     @requires_repo
     def head_commit(self) -> HashRef | None:
@@ -186,15 +330,38 @@ class Repository:
         :return: A list of SymRef objects representing the symbolic references.
         :raises RepositoryError: If the refs directory does not exist or is not a directory.
         :raises RepositoryNotFoundError: If the repository does not exist."""
-        refs_dir = self.refs_dir()
-        if not refs_dir.exists() or not refs_dir.is_dir():
-            msg = f'Refs directory does not exist or is not a directory: {refs_dir}'
-            raise RepositoryError(msg)
+        # Listing the refs directory reports it missing or not a directory by itself, so it is not stat'ed first
+        try:
+            return [SymRef(name) for name in self._iter_refs()]
+        except (FileNotFoundError, NotADirectoryError) as e:
+            msg = f'Refs directory does not exist or is not a directory: {self.refs_dir()}'
+            raise RepositoryError(msg) from e
 
-        refs: list[SymRef] = [SymRef(ref_file.name) for ref_file in refs_dir.rglob('*')
-                              if ref_file.is_file()]
+    def _iter_refs(self) -> Generator[str, None, None]:
+        # Walk the refs directory with scandir, which types each entry from the directory read
+        # instead of building a Path and issuing a stat for it
+        stack = [os.fspath(self.refs_dir())]
 
-        return refs
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        yield entry.name
+                    elif entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+
+    def _classify_ref(self, name: str) -> Ref:
+        # Try to figure out what kind of ref a name is by looking for a ref file of that name,
+        # either relative to the refs directory or as a branch name
+        if name.upper() == 'HEAD' or (self._refs_dir / name).is_file():
+            return SymRef(name)
+        if (self._heads_dir / name).is_file():
+            return branch_ref(name)
+        if is_hash(name):
+            return HashRef(name)
+
+        msg = f'Invalid reference: {name}'
+        raise RefError(msg)
 
     @requires_repo
     def resolve_ref(self, ref: Ref | str | None) -> HashRef | None:
@@ -204,30 +371,30 @@ class Repository:
         :return: The resolved HashRef or None if the reference does not exist.
         :raises RefError: If the reference is invalid or cannot be resolved.
         :raises RepositoryNotFoundError: If the repository does not exist."""
-        match ref:
-            case HashRef():
-                return ref
-            case SymRef(ref):
-                if ref.upper() == 'HEAD':
-                    return self.resolve_ref(self.head_ref())
-
-                ref = read_ref(self.refs_dir() / ref)
-                return self.resolve_ref(ref)
-            case str():
-                # Try to figure out what kind of ref it is by looking at the list of refs
-                # in the refs directory
-                if ref.upper() == 'HEAD' or ref in self.refs():
-                    return self.resolve_ref(SymRef(ref))
-                if len(ref) == HASH_LENGTH and all(c in HASH_CHARSET for c in ref):
-                    return HashRef(ref)
-
-                msg = f'Invalid reference: {ref}'
-                raise RefError(msg)
-            case None:
-                return None
-            case _:
-                msg = f'Invalid reference type: {type(ref)}'
-                raise RefError(msg)
+        # Follow the chain of references iteratively, remembering the symbolic ones to catch cycles
+        seen: set[str] = set()
+
+        while True:
+            match ref:
+                case HashRef():
+                    return ref
+                case SymRef():
+                    if ref in seen:
+                        msg = f'Circular reference: {ref}'
+                        raise RefError(msg)
+                    seen.add(ref)
+
+                    if ref.upper() == 'HEAD':
+                        ref = self.head_ref()
+                    else:
+                        ref = read_ref(self._refs_dir / ref)
+                case str():
+                    ref = self._classify_ref(ref)
+                case None:
+                    return None
+                case _:
+                    msg = f'Invalid reference type: {type(ref)}'
+                    raise RefError(msg)
 
     @requires_repo
     def update_ref(self, ref_name: str, new_ref: Ref) -> None:
@@ -255,6 +422,7 @@ class Repository:
 
         :raises RepositoryNotFoundError: If the repository does not exist."""
         shutil.rmtree(self.repo_path())
+        self._forget_loaded_objects()
 
     @requires_repo
     def save_file_content(self, file: Path) -> Blob:
@@ -320,7 +488,8 @@ class Repository:
 
         :return: A list of branch names.
         :raises RepositoryNotFoundError: If the repository does not exist."""
-        return [x.name for x in self.heads_dir().iterdir() if x.is_file()]
+        with os.scandir(self.heads_dir()) as entries:
+            return [entry.name for entry in entries if entry.is_file(follow_symlinks=False)]
 
     @requires_repo
     def save_dir(self, path: Path) -> HashRef:
@@ -334,33 +503,68 @@ class Repository:
             msg = f'{path} is not a directory'
             raise NotADirectoryError(msg)
 
-        stack = deque([path])
-        hashes: dict[Path, str] = {}
+        return self._save_dir_tree(os.path.normpath(path.absolute()), None, set(), set())
 
-        while stack:
-            current_path = stack.pop()
-            tree_records: dict[str, TreeRecord] = {}
+    @requires_repo
+    def save_dir_incremental(self, path: Path, previous_tree_hash: str | None, dirty_paths: set[Path]) -> HashRef:
+        """Save the content of a directory to the repository, re-reading only what changed since a previous save.
 
-            for item in current_path.iterdir():
-                if item.name == self.repo_dir.name:
-                    continue
-                if item.is_file():
-                    blob = self.save_file_content(item)
-                    tree_records[item.name] = TreeRecord(TreeRecordType.BLOB, blob.hash, item.name)
-                elif item.is_dir():
-                    if item in hashes:  # If the directory has already been processed, use its hash
-                        subtree_hash = hashes[item]
-                        tree_records[item.name] = TreeRecord(TreeRecordType.TREE, subtree_hash, item.name)
-                    else:
-                        stack.append(current_path)
-                        stack.append(item)
-                        break
-            else:
-                tree = Tree(tree_records)
-                save_tree(self.objects_dir(), tree)
-                hashes[current_path] = hash_object(tree)
+        Subdirectories without dirty paths keep their tree from the previous save and clean files keep their blob.
+        A dirty directory is saved in full.
 
-        return HashRef(hashes[path])
+        :param path: The path to the directory to save.
+        :param previous_tree_hash: The tree hash of the previous save of the directory, or None to save it in full.
+        :param dirty_paths: The files and directories added, modified or removed since the previous save,
+            either absolute or relative to `path`.
+        :return: A HashRef object representing the saved directory tree object.
+        :raises NotADirectoryError: If the path is not a directory.
+        :raises RepositoryError: If a tree of the previous save cannot be loaded.
+        :raises RepositoryNotFoundError: If the repository does not exist."""
+        if not path or not path.is_dir():
+            msg = f'{path} is not a directory'
+            raise NotADirectoryError(msg)
+
+        root = path.absolute()
+        root_path = os.path.normpath(root)
+        dirty = {os.path.normpath(root / dirty_path) for dirty_path in dirty_paths}
+        if previous_tree_hash is None or root_path in dirty:
+            return self.save_dir(path)
+
+        # Directories that contain a dirty path have to be listed again, the others are reused as they are
+        dirty_parents: set[str] = set()
+        for dirty_path in dirty:
+            for parent in Path(dirty_path).parents:
+                parent_path = os.fspath(parent)
+                if parent_path in dirty_parents:
+                    break
+                dirty_parents.add(parent_path)
+
+        return self._save_dir_tree(root_path, self._load_previous_tree(previous_tree_hash), dirty, dirty_parents)
+
+    def _save_dir_tree(self, root_path: str, previous_tree: Tree | None, dirty: set[str],
+                       dirty_parents: set[str]) -> HashRef:
+        # Only files of the working directory are remembered, so saving other directories leaves no stale entries
+        in_working_dir = Path(root_path).is_relative_to(self.working_dir.absolute())
+        hash_cache = HashCache(self.hash_cache_file()) if in_working_dir else None
+
+        with ThreadPoolExecutor() as executor:
+            saver = _DirSaver(self.objects_dir(), self.repo_dir.name, hash_cache, executor, self._load_previous_tree)
+            tree_hash = saver.save(root_path, previous_tree, dirty, dirty_parents)
+
+        if hash_cache is not None:
+            # Only a full walk has seen every file under the root, so only then are the other entries gone
+            if previous_tree is None:
+                hash_cache.prune(root_path)
+            hash_cache.save()
+
+        return HashRef(tree_hash)
+
+    def _load_previous_tree(self, tree_hash: str) -> Tree:
+        try:
+            return self._load_tree(tree_hash)
+        except Exception as e:
+            msg = f'Error loading previous tree {tree_hash}'
+            raise RepositoryError(msg) from e
 
     @requires_repo
     def commit_working_dir(self, author: str, message: str) -> HashRef:
@@ -401,10 +605,15 @@ class Repository:
         commit_ref = HashRef(hash_object(commit))
 
         save_commit(self.objects_dir(), commit)
+        commit_graph = self.commit_graph()
+        commit_graph.add(commit_ref, commit)
 
         if branch:
             self.update_ref(branch, commit_ref)
 
+        # Recording the commit in the graph file never reads history, so an unreadable ancestor cannot fail it
+        commit_graph.store(commit_ref)
+
         return commit_ref
 
     @requires_repo
@@ -420,7 +629,7 @@ class Repository:
 
         try:
             while current_hash:
-                commit = load_commit(self.objects_dir(), current_hash)
+                commit = self._load_commit(current_hash)
                 yield LogEntry(HashRef(current_hash), commit)
 
                 # Commit now stores parents as a list; follow the first parent to
@@ -430,9 +639,10 @@ class Repository:
         except Exception as e:
             msg = f'Error loading commit {current_hash}'
             raise RepositoryError(msg) from e
-    
+
     def _write_tree_to_working_dir(self, tree: Tree, path: Path) -> None:
         """Write a tree structure to the working directory."""
+        objects_dir = self.objects_dir()
         stack: list[tuple[Tree, Path]] = [(tree, path)]
 
         while stack:
@@ -444,7 +654,7 @@ class Repository:
 
                 if record.type == TreeRecordType.BLOB:
                     try:
-                        with open_content_for_reading(self.objects_dir(), record.hash) as src:
+                        with open_content_for_reading(objects_dir, record.hash) as src:
                             with record_path.open('wb') as dest:
                                 shutil.copyfileobj(src, dest)
                     except Exception as e:
@@ -453,7 +663,7 @@ class Repository:
                 elif record.type == TreeRecordType.TREE:
                     try:
                         record_path.mkdir(parents=True, exist_ok=True)
-                        subtree = load_tree(self.objects_dir(), record.hash)
+                        subtree = self._load_tree(record.hash)
                     except Exception as e:
                         raise RepositoryError('Error loading subtree for checkout') from e
 
@@ -468,18 +678,23 @@ class Repository:
             else:
                 item.unlink()     
         
-    def _source_to_tree(self, source: Ref | str | Path) -> tuple[Tree, dict[str, Tree] | None]:
+    def _source_to_tree(self, source: Ref | str | Path,
+                        hash_cache: HashCache | None = None) -> tuple[Tree, str, dict[str, Tree] | None]:
+        # One cache serves every directory of an operation, so it is only parsed once
+        if hash_cache is None:
+            hash_cache = HashCache(self.hash_cache_file())
+
         # Path case: either a Path object or a string that points to an existing directory
         if isinstance(source, Path):
-            if source.exists() and source.is_dir():
-                root_tree, _, subtrees = build_tree_from_fs(source, self.repo_dir.name)
-                return root_tree, subtrees
+            if source.is_dir():
+                root_tree, root_hash, subtrees = build_tree_from_fs(source, self.repo_dir.name, hash_cache)
+                return root_tree, root_hash, subtrees
         # Note: directory paths take precedence over ref-like strings (even if the name looks like a hash).
         if isinstance(source, str):
             p = Path(source)
-            if p.exists() and p.is_dir():
-                root_tree, _, subtrees = build_tree_from_fs(p, self.repo_dir.name)
-                return root_tree, subtrees
+            if p.is_dir():
+                root_tree, root_hash, subtrees = build_tree_from_fs(p, self.repo_dir.name, hash_cache)
+                return root_tree, root_hash, subtrees
 
         # Commit/ref case (Ref object, commit hash string, ref string)
         commit_hash = self.resolve_ref(source)
@@ -487,18 +702,18 @@ class Repository:
             msg = f'Cannot resolve reference {source}'
             raise RefError(msg)
 
-        commit = load_commit(self.objects_dir(), commit_hash)
-        root_tree = load_tree(self.objects_dir(), commit.tree_hash)
-        return root_tree, None
+        commit = self._load_commit(commit_hash)
+        root_tree = self._load_tree(commit.tree_hash)
+        return root_tree, commit.tree_hash, None
         
     def _make_lookup(self, mem_trees: dict[str, Tree] | None):
         if mem_trees is None:
-            return lambda tree_hash: load_tree(self.objects_dir(), tree_hash)
+            return self._load_tree
 
         def _lookup(tree_hash: str) -> Tree:
             if tree_hash in mem_trees:
                 return mem_trees[tree_hash]
-            return load_tree(self.objects_dir(), tree_hash)
+            return self._load_tree(tree_hash)
 
         return _lookup
 
@@ -525,8 +740,9 @@ class Repository:
             return []
 
         try:
-            tree1, mem1 = self._source_to_tree(source1)
-            tree2, mem2 = self._source_to_tree(source2)
+            hash_cache = HashCache(self.hash_cache_file())
+            tree1, tree_hash1, mem1 = self._source_to_tree(source1, hash_cache)
+            tree2, tree_hash2, mem2 = self._source_to_tree(source2, hash_cache)
             lookup1 = self._make_lookup(mem1)
             lookup2 = self._make_lookup(mem2)          
         
@@ -534,91 +750,89 @@ class Repository:
             msg = 'Error loading commit or tree'
             raise RepositoryError(msg) from e
 
+        # Different sources can still snapshot the same tree, e.g. two branches at one commit
+        # or a clean working directory
+        if tree_hash1 == tree_hash2:
+            return []
+
         top_level_diff = Diff(TreeRecord(TreeRecordType.TREE, '', ''), None, [])
         stack = [(tree1, tree2, top_level_diff)]
 
-        potentially_added: dict[str, Diff] = {}
-        potentially_removed: dict[str, Diff] = {}
+        # Unmatched added/removed diffs by hash, together with their index in their parent's children
+        # so a later match can replace them in place
+        potentially_added: dict[str, tuple[Diff, int]] = {}
+        potentially_removed: dict[str, tuple[Diff, int]] = {}
 
         while stack:
             current_tree1, current_tree2, parent_diff = stack.pop()
             records1 = current_tree1.records if current_tree1 else {}
             records2 = current_tree2.records if current_tree2 else {}
 
-            for name, record1 in records1.items():
-                if name not in records2:
-                    local_diff: Diff
+            # Walk both record sets in a single pass, in name order
+            for name in sorted(records1.keys() | records2.keys()):
+                record1 = records1.get(name)
+                record2 = records2.get(name)
+                local_diff: Diff
 
+                if record2 is None:
                     # This name is no longer in the tree, so it was either moved or removed
                     # Have we seen this hash before as a potentially-added record?
-                    if record1.hash in potentially_added:
-                        added_diff = potentially_added[record1.hash]
-                        del potentially_added[record1.hash]
+                    added = potentially_added.pop(record1.hash, None)
+                    if added is not None:
+                        added_diff, added_index = added
 
                         local_diff = MovedToDiff(record1, parent_diff, [], None)
                         moved_from_diff = MovedFromDiff(added_diff.record, added_diff.parent, [], local_diff)
                         local_diff.moved_to = moved_from_diff
 
                         # Replace the original added diff with a moved-from diff
-                        added_diff.parent.children = (
-                            [_ if _.record.hash != record1.hash
-                             else moved_from_diff
-                             for _ in added_diff.parent.children])
+                        added_diff.parent.children[added_index] = moved_from_diff
 
                     else:
                         local_diff = RemovedDiff(record1, parent_diff, [])
-                        potentially_removed[record1.hash] = local_diff
-
-                    parent_diff.children.append(local_diff)
-                else:
-                    record2 = records2[name]
-
-                    # This record is identical in both trees, so no diff is needed
-                    if record1.hash == record2.hash:
-                        continue
-
-                    # If the record is a tree, we need to recursively compare the trees
-                    if record1.type == TreeRecordType.TREE and record2.type == TreeRecordType.TREE:
-                        subtree_diff = ModifiedDiff(record1, parent_diff, [])
-
-                        try:
-                            subtree1 = lookup1(record1.hash)
-                            subtree2 = lookup2(record2.hash)
-                        except Exception as e:
-                            msg = 'Error loading subtree for diff'
-                            raise RepositoryError(msg) from e
-
-                        stack.append((subtree1, subtree2, subtree_diff))
-                        parent_diff.children.append(subtree_diff)
-                    else:
-                        modified_diff = ModifiedDiff(record1, parent_diff, [])
-                        parent_diff.children.append(modified_diff)
+                        potentially_removed[record1.hash] = (local_diff, len(parent_diff.children))
 
-            for name, record2 in records2.items():
-                if name not in records1:
+                elif record1 is None:
                     # This name is in the new tree but not in the old tree, so it was either
                     # added or moved
                     # If we've already seen this hash, it was moved, so convert the original
-                    # added diff to a moved diff
-                    if record2.hash in potentially_removed:
-                        removed_diff = potentially_removed[record2.hash]
-                        del potentially_removed[record2.hash]
+                    # removed diff to a moved diff
+                    removed = potentially_removed.pop(record2.hash, None)
+                    if removed is not None:
+                        removed_diff, removed_index = removed
 
                         local_diff = MovedFromDiff(record2, parent_diff, [], None)
                         moved_to_diff = MovedToDiff(removed_diff.record, removed_diff.parent, [], local_diff)
                         local_diff.moved_from = moved_to_diff
 
-                        # Create a new diff for the moved record
-                        removed_diff.parent.children = (
-                            [_ if _.record.hash != record2.hash
-                             else moved_to_diff
-                             for _ in removed_diff.parent.children])
+                        # Replace the original removed diff with a moved-to diff
+                        removed_diff.parent.children[removed_index] = moved_to_diff
 
                     else:
                         local_diff = AddedDiff(record2, parent_diff, [])
-                        potentially_added[record2.hash] = local_diff
+                        potentially_added[record2.hash] = (local_diff, len(parent_diff.children))
+
+                # This record is identical in both trees, so no diff is needed
+                elif record1.hash == record2.hash:
+                    continue
 
-                    parent_diff.children.append(local_diff)
+                # If the record is a tree, we need to recursively compare the trees
+                elif record1.type == TreeRecordType.TREE and record2.type == TreeRecordType.TREE:
+                    local_diff = ModifiedDiff(record1, parent_diff, [])
+
+                    try:
+                        subtree1 = lookup1(record1.hash)
+                        subtree2 = lookup2(record2.hash)
+                    except Exception as e:
+                        msg = 'Error loading subtree for diff'
+                        raise RepositoryError(msg) from e
+
+                    stack.append((subtree1, subtree2, local_diff))
+
+                else:
+                    local_diff = ModifiedDiff(record1, parent_diff, [])
+
+                parent_diff.children.append(local_diff)
 
         return top_level_diff.children
     
@@ -638,7 +852,7 @@ class Repository:
             current_hash = self.resolve_ref(current)
             if current_hash is None:
                 # Empty current branch
-                wd_tree, _ = self._source_to_tree(self.working_dir)
+                wd_tree, _, _ = self._source_to_tree(self.working_dir)
                 if wd_tree.records:
                     raise RepositoryError('Checkout aborted: local changes would be overwritten.')
             else:
@@ -666,8 +880,8 @@ class Repository:
 
         # Load objects
         try:
-            target_commit = load_commit(self.objects_dir(), target_hash)
-            target_tree = load_tree(self.objects_dir(), target_commit.tree_hash)
+            target_commit = self._load_commit(target_hash)
+            target_tree = self._load_tree(target_commit.tree_hash)
         except Exception as e:
             raise RepositoryError('Error loading target objects') from e
 
@@ -685,7 +899,28 @@ class Repository:
         """Get the path to the HEAD file within the repository.
 
         :return: The path to the HEAD file."""
-        return self.repo_path() / HEAD_FILE
+        return self._head_file
+
+    def commit_graph(self) -> CommitGraph:
+        """Get the commit graph of the repository, shared by every history walk on this instance.
+
+        :return: The CommitGraph of the repository."""
+        if self._commit_graph is None:
+            self._commit_graph = CommitGraph(self.objects_dir(), self.commit_graph_file())
+
+        return self._commit_graph
+
+    def hash_cache_file(self) -> Path:
+        """Get the path to the file hash cache within the repository.
+
+        :return: The path to the hash cache file."""
+        return self._hash_cache_file
+
+    def commit_graph_file(self) -> Path:
+        """Get the path to the commit graph file within the repository.
+
+        :return: The path to the commit graph file."""
+        return self._commit_graph_file
 
 
 def branch_ref(branch: str) -> SymRef:
@@ -1,3 +1,6 @@
+#include <algorithm>
+#include <functional>
+
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include "caf.h"
@@ -9,11 +12,13 @@ namespace py = pybind11;
 
 PYBIND11_MODULE(_libcaf, m) {
     // caf
-    m.def("hash_file", hash_file);
+    // Hashing a file is pure I/O and digest work, so other Python threads may run meanwhile
+    m.def("hash_file", hash_file, py::call_guard<py::gil_scoped_release>());
     m.def("hash_string", hash_string);
     m.def("hash_length", hash_length);
-    m.def("save_file_content", save_file_content);
+    m.def("save_file_content", save_file_content, py::call_guard<py::gil_scoped_release>());
     m.def("open_content_for_writing", open_content_for_writing);
+    m.def("content_exists", content_exists);
     m.def("delete_content", delete_content);
     m.def("open_content_for_reading", open_content_for_reading);
 
@@ -24,9 +29,10 @@ PYBIND11_MODULE(_libcaf, m) {
 
     // object_io
     m.def("save_commit", &save_commit);
-    m.def("load_commit", &load_commit);
+    // Loading only touches C++ objects until the result is converted, which happens with the GIL held again
+    m.def("load_commit", &load_commit, py::call_guard<py::gil_scoped_release>());
     m.def("save_tree", &save_tree);
-    m.def("load_tree", &load_tree);
+    m.def("load_tree", &load_tree, py::call_guard<py::gil_scoped_release>());
 
     py::class_<Blob>(m, "Blob")
     .def(py::init<std::string>())
@@ -49,7 +55,17 @@ PYBIND11_MODULE(_libcaf, m) {
 
     py::class_<Tree>(m, "Tree")
     .def(py::init<const std::map<std::string, TreeRecord>&>())
-    .def_readonly("records", &Tree::records);
+    .def_readonly("records", &Tree::records)
+    .def("__eq__", [](const Tree &self, const Tree &other) {
+        return std::equal(self.records.begin(), self.records.end(), other.records.begin(), other.records.end(),
+                          [](const auto &a, const auto &b) {
+                              return a.first == b.first && a.second.type == b.second.type &&
+                                     a.second.hash == b.second.hash && a.second.name == b.second.name;
+                          });
+    })
+    .def("__hash__", [](const Tree &self) {
+        return std::hash<std::string>{}(hash_object(self));
+    });
 
     py::class_<Commit>(m, "Commit")
         .def(py::init<const string &, const string&, const string&, time_t, const std::vector<std::string>&>())
@@ -57,5 +73,13 @@ PYBIND11_MODULE(_libcaf, m) {
         .def_readonly("author", &Commit::author)
         .def_readonly("message", &Commit::message)
         .def_readonly("timestamp", &Commit::timestamp)
-        .def_readonly("parents", &Commit::parents);
+        .def_readonly("parents", &Commit::parents)
+        .def("__eq__", [](const Commit &self, const Commit &other) {
+            return self.tree_hash == other.tree_hash && self.author == other.author &&
+                   self.message == other.message && self.timestamp == other.timestamp &&
+                   self.parents == other.parents;
+        })
+        .def("__hash__", [](const Commit &self) {
+            return std::hash<std::string>{}(hash_object(self));
+        });
 }
\ No newline at end of file
@@ -6,10 +6,11 @@
 #include <sys/stat.h>
 #include <fcntl.h>
 #include <sys/file.h>
+#include <sys/mman.h>
+#include <unistd.h>
 #include <openssl/evp.h>
 #include <tuple>
 #include <iostream>
-#include <fstream>
 #include <filesystem>
 #include <memory>
 #include <iomanip>
@@ -17,16 +18,28 @@
 #include <vector>
 #include <chrono>
 #include <thread>
+#include <atomic>
 
 #include "caf.h"
 
-constexpr size_t BUFFER_SIZE = 4096;
+constexpr size_t HASH_BUFFER_SIZE = 64 * 1024;
+// Files at least this large are hashed from a memory mapping instead of being copied through a buffer
+constexpr off_t HASH_MMAP_THRESHOLD = 1024 * 1024;
 constexpr size_t DIR_NAME_SIZE = 2;
+// Temporary files left behind by a crashed process with a recycled id are skipped this many times at most
+constexpr int TEMP_FILE_ATTEMPTS = 100;
 
+std::atomic<unsigned long> temp_file_counter{0};
+
+void create_root_dir(const std::string& content_root_dir);
 std::string create_sub_dir(const std::string& content_root_dir, const std::string& hash);
 void lock_file_with_timeout(int fd, int operation, int timeout_sec);
-void copy_file(const std::string& src, const std::string& dest);
+void copy_file_to_fd(const std::string& src, int dest_fd);
 void create_content_path(const std::string& content_root_dir, const std::string& hash, std::string& output_path);
+std::string object_path(const std::string& content_root_dir, const std::string& hash);
+std::string to_hex(const unsigned char* digest, unsigned int length);
+bool digest_mapped_file(int fd, EVP_MD_CTX* mdctx, bool& ok);
+bool digest_read_file(int fd, EVP_MD_CTX* mdctx);
 
 std::string hash_file(const std::string& filename) {
     unsigned char hash[EVP_MAX_MD_SIZE];
@@ -42,28 +55,26 @@ std::string hash_file(const std::string& filename) {
         throw std::runtime_error("Failed to initialize digest");
     }
 
-    std::ifstream file(filename, std::ios::binary);
-    if (!file){
+    int fd = open(filename.c_str(), O_RDONLY);
+    if (fd < 0){
         EVP_MD_CTX_free(mdctx);
         throw std::runtime_error("Failed to open file");
     }
 
-    std::vector<char> buffer(BUFFER_SIZE);
-    while (file.read(buffer.data(), BUFFER_SIZE)) {
-        if (EVP_DigestUpdate(mdctx, buffer.data(), BUFFER_SIZE) != 1){
-            EVP_MD_CTX_free(mdctx);
-            throw std::runtime_error("Failed to update digest");
-        }
-    }
+    // Large files are digested straight from a mapping; the rest, and any file that cannot be
+    // mapped, are read through a buffer
+    bool ok;
+    if (!digest_mapped_file(fd, mdctx, ok))
+        ok = digest_read_file(fd, mdctx);
 
-    // Handle the last partial read
-    if (file.gcount() > 0) {
-        if (EVP_DigestUpdate(mdctx, buffer.data(), file.gcount()) != 1){
-            EVP_MD_CTX_free(mdctx);
-            throw std::runtime_error("Failed to update digest");
-        }
+    if (!ok) {
+        close(fd);
+        EVP_MD_CTX_free(mdctx);
+        throw std::runtime_error("Failed to hash file");
     }
 
+    close(fd);
+
     if (EVP_DigestFinal_ex(mdctx, hash, &hash_len) != 1){
         EVP_MD_CTX_free(mdctx);
         throw std::runtime_error("Failed to finalize digest");
@@ -71,13 +82,7 @@ std::string hash_file(const std::string& filename) {
 
     EVP_MD_CTX_free(mdctx);
 
-    std::ostringstream oss;
-    oss << std::hex << std::setfill('0');
-    for (unsigned int i = 0; i < hash_len; ++i) {
-        oss << std::setw(2) << static_cast<unsigned int>(hash[i]);
-    }
-
-    return oss.str();
+    return to_hex(hash, hash_len);
 }
 
 std::string hash_string(const std::string& content) {
@@ -109,13 +114,7 @@ std::string hash_string(const std::string& content) {
 
     EVP_MD_CTX_free(mdctx);
 
-    std::ostringstream oss;
-    oss << std::hex << std::setfill('0');
-    for (unsigned int i = 0; i < hash_len; ++i) {
-        oss << std::setw(2) << static_cast<unsigned int>(hash[i]);
-    }
-
-    return oss.str();
+    return to_hex(hash.data(), hash_len);
 }
 
 unsigned int hash_length() {
@@ -123,62 +122,30 @@ unsigned int hash_length() {
 }
 
 Blob save_file_content(const std::string& content_root_dir, const std::string& file_path) {
-    std::error_code ec;
-    std::filesystem::create_directories(content_root_dir, ec);
-    if (ec && ec != std::errc::file_exists) {
-        throw std::runtime_error("Failed to create root directory: " + ec.message());
-    }
-
-    // Set directory permissions to 0755 (owner: rwx, group/others: rx)
-    std::filesystem::permissions(content_root_dir,
-        std::filesystem::perms::owner_all | std::filesystem::perms::group_read |
-        std::filesystem::perms::others_read, ec);
-
     std::string file_hash = hash_file(file_path);
 
-    std::string content_path;
-    create_content_path(content_root_dir, file_hash, content_path);
-
-    int fd = open(content_path.c_str(), O_WRONLY | O_CREAT, 0644);
+    // Objects are content addressed and only ever appear complete, so an existing object
+    // already holds exactly this content
+    if (content_exists(content_root_dir, file_hash))
+        return Blob(file_hash);
 
-    if (fd < 0)
-        throw std::runtime_error("Failed to open file");
-
-    try{
-        lock_file_with_timeout(fd, LOCK_EX, 10);
-    } catch (const std::exception& e){
-        close(fd);
-        throw;
-    }
+    std::string temp_path;
+    int fd = open_temp_content(content_root_dir, file_hash, temp_path);
 
     try {
-        copy_file(file_path, content_path);
+        copy_file_to_fd(file_path, fd);
     } catch (const std::exception& e) {
-        std::error_code ec;
-        std::filesystem::remove(content_path, ec);
-        flock(fd, LOCK_UN);
-        close(fd);
+        discard_temp_content(fd, temp_path);
         throw;
     }
 
-    flock(fd, LOCK_UN);
-    close(fd);
+    publish_content(content_root_dir, file_hash, fd, temp_path);
 
     return Blob(file_hash);
 }
 
 int open_content_for_writing(const std::string& content_root_dir, const std::string& content_hash) {
-    std::error_code ec;
-    std::filesystem::create_directories(content_root_dir, ec);
-    if (ec && ec != std::errc::file_exists) {
-        throw std::runtime_error("Failed to create root directory: " + ec.message());
-    }
-
-    // Set directory permissions to 0755 (owner: rwx, group/others: rx)
-    std::filesystem::permissions(content_root_dir,
-        std::filesystem::perms::owner_all |
-        std::filesystem::perms::group_read | std::filesystem::perms::group_exec |
-        std::filesystem::perms::others_read | std::filesystem::perms::others_exec, ec);
+    create_root_dir(content_root_dir);
 
     std::string content_path;
     create_content_path(content_root_dir, content_hash, content_path);
@@ -199,9 +166,79 @@ int open_content_for_writing(const std::string& content_root_dir, const std::str
     return fd;
 }
 
+// Open a fresh temporary file next to where the object will live. The object is written there
+// and then moved into place by publish_content, so its final path never holds partial content.
+// Where the kernel supports it the file is anonymous (O_TMPFILE) and gets its name only once it
+// is linked into place, which saves creating and renaming a named one. Otherwise temp_path is set
+// to a named temporary file. Either way the file is created with the same mode objects always
+// had, so the umask applies to it.
+int open_temp_content(const std::string& content_root_dir, const std::string& content_hash, std::string& temp_path) {
+    create_root_dir(content_root_dir);
+
+    const std::string sub_dir_path = create_sub_dir(content_root_dir, content_hash);
+
+#ifdef O_TMPFILE
+    // Linking an anonymous file goes through its /proc/self/fd entry
+    static const bool proc_fd_available = access("/proc/self/fd", X_OK) == 0;
+    if (proc_fd_available) {
+        int fd = open(sub_dir_path.c_str(), O_TMPFILE | O_WRONLY, 0644);
+        if (fd >= 0) {
+            temp_path.clear();
+            return fd;
+        }
+        // File systems without O_TMPFILE support fall back to a named temporary file
+        if (errno != EOPNOTSUPP && errno != EISDIR && errno != EINVAL)
+            throw std::runtime_error("Failed to create temporary file");
+    }
+#endif
+
+    // A name no other thread or process picks: the process id and a per-process counter
+    const std::string temp_prefix = sub_dir_path + "/" + content_hash + ".tmp" + std::to_string(getpid()) + ".";
+    for (int attempt = 0; attempt < TEMP_FILE_ATTEMPTS; ++attempt) {
+        temp_path = temp_prefix + std::to_string(temp_file_counter++);
+
+        int fd = open(temp_path.c_str(), O_WRONLY | O_CREAT | O_EXCL, 0644);
+        if (fd >= 0)
+            return fd;
+        if (errno != EEXIST)
+            break;
+    }
+
+    throw std::runtime_error("Failed to create temporary file");
+}
+
+// Atomically move a fully written temporary file to its object path and close it
+void publish_content(const std::string& content_root_dir, const std::string& content_hash, int fd,
+                     const std::string& temp_path) {
+    const std::string content_path = object_path(content_root_dir, content_hash);
+
+    if (temp_path.empty()) {
+        const std::string fd_path = "/proc/self/fd/" + std::to_string(fd);
+        // Objects are content addressed, so finding one already in place means it holds this content
+        bool linked = linkat(AT_FDCWD, fd_path.c_str(), AT_FDCWD, content_path.c_str(), AT_SYMLINK_FOLLOW) == 0 ||
+                      errno == EEXIST;
+        close(fd);
+        if (!linked)
+            throw std::runtime_error("Failed to move object into place");
+        return;
+    }
+
+    close(fd);
+    if (rename(temp_path.c_str(), content_path.c_str()) != 0) {
+        unlink(temp_path.c_str());
+        throw std::runtime_error("Failed to move object into place");
+    }
+}
+
+// Close a temporary file that will not be published, removing it if it has a name
+void discard_temp_content(int fd, const std::string& temp_path) {
+    close(fd);
+    if (!temp_path.empty())
+        unlink(temp_path.c_str());
+}
+
 void delete_content(const std::string& content_root_dir, const std::string& content_hash) {
-    std::string content_path;
-    create_content_path(content_root_dir, content_hash, content_path);
+    const std::string content_path = object_path(content_root_dir, content_hash);
 
     int fd = open(content_path.c_str(), O_RDONLY);
     if (fd < 0)
@@ -230,8 +267,7 @@ void delete_content(const std::string& content_root_dir, const std::string& cont
 }
 
 int open_content_for_reading(const std::string& content_root_dir, const std::string& content_hash) {
-    std::string content_path;
-    create_content_path(content_root_dir, content_hash, content_path);
+    const std::string content_path = object_path(content_root_dir, content_hash);
 
     int fd = open(content_path.c_str(), O_RDONLY);
 
@@ -248,44 +284,38 @@ int open_content_for_reading(const std::string& content_root_dir, const std::str
     return fd;
 }
 
-void copy_file(const std::string& src, const std::string& dest) {
-    std::ifstream source_file(src, std::ios::binary);
-    if (!source_file) {
+void copy_file_to_fd(const std::string& src, int dest_fd) {
+    int src_fd = open(src.c_str(), O_RDONLY);
+    if (src_fd < 0) {
         throw std::runtime_error("Failed to open source file");
     }
 
-    std::ofstream dest_file(dest, std::ios::binary);
-    if (!dest_file) {
-        throw std::runtime_error("Failed to open destination file");
-    }
-
-    std::vector<char> buffer(BUFFER_SIZE);
-    while (source_file.read(buffer.data(), BUFFER_SIZE)) {
-        if (!dest_file.write(buffer.data(), BUFFER_SIZE)) {
-            throw std::runtime_error("Failed to write to destination file");
-        }
+    posix_fadvise(src_fd, 0, 0, POSIX_FADV_SEQUENTIAL);
 
-        if (dest_file.fail()) {
-            throw std::runtime_error("Error while writing to destination file");
+    std::vector<char> buffer(HASH_BUFFER_SIZE);
+    ssize_t bytes_read;
+    while ((bytes_read = read(src_fd, buffer.data(), HASH_BUFFER_SIZE)) != 0) {
+        if (bytes_read < 0) {
+            if (errno == EINTR)
+                continue;
+            close(src_fd);
+            throw std::runtime_error("Failed to read source file");
         }
-    }
 
-    // Handle the last partial read
-    if (source_file.gcount() > 0) {
-        if (!dest_file.write(buffer.data(), source_file.gcount())) {
-            throw std::runtime_error("Failed to write to destination file");
-        }
-
-        if (dest_file.fail()) {
-            throw std::runtime_error("Error while writing to destination file");
+        // Retry short writes until the whole chunk is out
+        for (ssize_t written = 0; written < bytes_read;) {
+            ssize_t result = write(dest_fd, buffer.data() + written, bytes_read - written);
+            if (result < 0) {
+                if (errno == EINTR)
+                    continue;
+                close(src_fd);
+                throw std::runtime_error("Failed to write to destination file");
+            }
+            written += result;
         }
     }
 
-    // Explicit flush to ensure all data is written
-    dest_file.flush();
-    if (dest_file.fail()) {
-        throw std::runtime_error("Failed to flush destination file");
-    }
+    close(src_fd);
 }
 
 void create_content_path(const std::string& content_root_dir, const std::string& hash, std::string& output_path) {
@@ -295,6 +325,32 @@ void create_content_path(const std::string& content_root_dir, const std::string&
     output_path = create_sub_dir(content_root_dir, hash) + "/" + hash;
 }
 
+// Path of an object without creating its sub directory, for operations that never create the object
+std::string object_path(const std::string& content_root_dir, const std::string& hash) {
+    if (content_root_dir.empty() || hash.length() < DIR_NAME_SIZE)
+        throw std::invalid_argument("Invalid argument");
+
+    return content_root_dir + "/" + hash.substr(0, DIR_NAME_SIZE) + "/" + hash;
+}
+
+bool content_exists(const std::string& content_root_dir, const std::string& content_hash) {
+    return access(object_path(content_root_dir, content_hash).c_str(), F_OK) == 0;
+}
+
+void create_root_dir(const std::string& content_root_dir) {
+    std::error_code ec;
+    std::filesystem::create_directories(content_root_dir, ec);
+    if (ec && ec != std::errc::file_exists) {
+        throw std::runtime_error("Failed to create root directory: " + ec.message());
+    }
+
+    // Set directory permissions to 0755 (owner: rwx, group/others: rx)
+    std::filesystem::permissions(content_root_dir,
+        std::filesystem::perms::owner_all |
+        std::filesystem::perms::group_read | std::filesystem::perms::group_exec |
+        std::filesystem::perms::others_read | std::filesystem::perms::others_exec, ec);
+}
+
 std::string create_sub_dir(const std::string& content_root_dir, const std::string& hash) {
     if (content_root_dir.empty() || hash.length() < 2)
         throw std::invalid_argument("Invalid argument");
@@ -331,3 +387,54 @@ void lock_file_with_timeout(int fd, int operation, int timeout_sec){
             throw std::runtime_error("Failed to acquire lock");
     }
 }
+
+std::string to_hex(const unsigned char* digest, unsigned int length) {
+    static constexpr char HEX_DIGITS[] = "0123456789abcdef";
+
+    std::string hex(length * 2, '\0');
+    for (unsigned int i = 0; i < length; ++i) {
+        hex[2 * i] = HEX_DIGITS[digest[i] >> 4];
+        hex[2 * i + 1] = HEX_DIGITS[digest[i] & 0x0f];
+    }
+
+    return hex;
+}
+
+// Digest a large file straight from a read-only mapping, saving the copy into a user buffer.
+// Returns false if the file is not mapped, otherwise sets ok to whether the digest succeeded.
+bool digest_mapped_file(int fd, EVP_MD_CTX* mdctx, bool& ok) {
+    struct stat st;
+    if (fstat(fd, &st) != 0 || !S_ISREG(st.st_mode) || st.st_size < HASH_MMAP_THRESHOLD)
+        return false;
+
+    void* data = mmap(nullptr, st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+    if (data == MAP_FAILED)
+        return false;
+
+    madvise(data, st.st_size, MADV_SEQUENTIAL);
+    ok = EVP_DigestUpdate(mdctx, data, st.st_size) == 1;
+    munmap(data, st.st_size);
+
+    return true;
+}
+
+// Feed the digest straight from read(2) in large chunks, bypassing iostream buffering
+bool digest_read_file(int fd, EVP_MD_CTX* mdctx) {
+    // The file is read front to back exactly once
+    posix_fadvise(fd, 0, 0, POSIX_FADV_SEQUENTIAL);
+
+    std::vector<char> buffer(HASH_BUFFER_SIZE);
+    ssize_t bytes_read;
+    while ((bytes_read = read(fd, buffer.data(), HASH_BUFFER_SIZE)) != 0) {
+        if (bytes_read < 0) {
+            if (errno == EINTR)
+                continue;
+            return false;
+        }
+
+        if (EVP_DigestUpdate(mdctx, buffer.data(), bytes_read) != 1)
+            return false;
+    }
+
+    return true;
+}
@@ -15,6 +15,11 @@ std::string hash_string(const std::string& content);
 Blob save_file_content(const std::string& content_root_dir, const std::string& file_path);
 int open_content_for_reading(const std::string& content_root_dir, const std::string& content_hash);
 int open_content_for_writing(const std::string& content_root_dir, const std::string& content_hash);
+bool content_exists(const std::string& content_root_dir, const std::string& content_hash);
+int open_temp_content(const std::string& content_root_dir, const std::string& content_hash, std::string& temp_path);
+void publish_content(const std::string& content_root_dir, const std::string& content_hash, int fd,
+                     const std::string& temp_path);
+void discard_temp_content(int fd, const std::string& temp_path);
 
 void delete_content(const std::string& content_root_dir, const std::string& content_hash);
 
@@ -6,26 +6,44 @@ std::string hash_object(const Blob& blob) {
 }
 
 std::string hash_object(const Tree& tree) {
+    // Size the buffer up front and append each field in place, so building the digest input
+    // does not allocate a temporary string per record
+    size_t total_size = 0;
+    for (const auto& [key, record] : tree.records) {
+        total_size += record.name.size() + record.hash.size() + 1;
+    }
+
     std::string acc_std;
+    acc_std.reserve(total_size);
 
     for (const auto& [key, record] : tree.records) {
-        acc_std += record.name + std::to_string(static_cast<int>(record.type)) + record.hash;
+        acc_std.append(record.name);
+        acc_std.append(std::to_string(static_cast<int>(record.type)));
+        acc_std.append(record.hash);
     }
 
     return hash_string(acc_std);
 }
 
 std::string hash_object(const Commit& commit) {
+    const std::string timestamp = std::to_string(commit.timestamp);
+
+    size_t total_size = commit.tree_hash.size() + commit.author.size() + commit.message.size() + timestamp.size();
+    for (const auto& parent : commit.parents) {
+        total_size += parent.size();
+    }
+
     std::string acc;
+    acc.reserve(total_size);
 
     acc += commit.tree_hash;
     acc += commit.author;
     acc += commit.message;
-    acc += std::to_string(commit.timestamp);
+    acc += timestamp;
 
     for (const auto& parent : commit.parents) {
         acc += parent;
     }
 
     return hash_string(acc);
-}
\ No newline at end of file
+}
@@ -4,6 +4,7 @@
 #include <sys/file.h>
 #include <vector>
 #include <cstring>
+#include <cerrno>
 #include <cstdint>
 #include <stdexcept>
 #include <unordered_map>
@@ -16,38 +17,54 @@
 constexpr uint32_t MAX_LENGTH = 1024 * 1024;  // 1 MB limit for strings
 
 std::string read_length_prefixed_string(int fd); // Helper function to read a length-prefixed string safely
-void write_with_length(int fd, const std::string &data); // Helper function to write a length-prefixed string safely
-void save_tree_record(int fd, const TreeRecord &record); // Helper function to serialize a TreeRecord
+void append_with_length(std::string &buffer, const std::string &data); // Helper function to serialize a length-prefixed string
+void write_all(int fd, const std::string &buffer); // Helper function to write a whole buffer, retrying short writes
+void append_tree_record(std::string &buffer, const TreeRecord &record); // Helper function to serialize a TreeRecord
 TreeRecord load_tree_record(int fd); // Helper function to deserialize a TreeRecord
 
 // Serialize Commit to disk
 void save_commit(const std::string &root_dir, const Commit &commit) {
     std::string commit_hash = hash_object(commit);
 
-    int fd = open_content_for_writing(root_dir, commit_hash);
+    // The object is content addressed and only ever appears complete, so if it exists it
+    // already holds this commit
+    if (content_exists(root_dir, commit_hash))
+        return;
 
-    try {
-        write_with_length(fd, commit.tree_hash);
-        write_with_length(fd, commit.author);
-        write_with_length(fd, commit.message);
+    std::string temp_path;
+    int fd = open_temp_content(root_dir, commit_hash, temp_path);
 
-        if (write(fd, &commit.timestamp, sizeof(commit.timestamp)) != sizeof(commit.timestamp))
-            throw std::runtime_error("Failed to write timestamp");
-        
+    try {
+        // Serialize the whole commit into one buffer and write it with a single call,
+        // rather than issuing two writes per field
         const uint32_t parents_count = commit.parents.size();
-        if (write(fd, &parents_count, sizeof(parents_count)) != sizeof(parents_count))
-            throw std::runtime_error("Failed to write parents count");
-            
+
+        size_t total_size = 3 * sizeof(uint32_t) + commit.tree_hash.size() + commit.author.size() +
+                            commit.message.size() + sizeof(commit.timestamp) + sizeof(parents_count);
         for (const auto &parent : commit.parents) {
-            write_with_length(fd, parent);
+            total_size += sizeof(uint32_t) + parent.size();
         }
 
-        flock(fd, LOCK_UN);
-        close(fd);
+        std::string buffer;
+        buffer.reserve(total_size);
+
+        append_with_length(buffer, commit.tree_hash);
+        append_with_length(buffer, commit.author);
+        append_with_length(buffer, commit.message);
+        buffer.append(reinterpret_cast<const char *>(&commit.timestamp), sizeof(commit.timestamp));
+        buffer.append(reinterpret_cast<const char *>(&parents_count), sizeof(parents_count));
+
+        for (const auto &parent : commit.parents) {
+            append_with_length(buffer, parent);
+        }
+
+        write_all(fd, buffer);
     } catch (const std::exception &e) {
-        delete_content(root_dir, commit_hash);
+        discard_temp_content(fd, temp_path);
         throw;
     }
+
+    publish_content(root_dir, commit_hash, fd, temp_path);
 }
 
 // Deserialize Commit from disk
@@ -81,23 +98,39 @@ Commit load_commit(const std::string &root_dir, const std::string &commit_hash)
 void save_tree(const std::string &root_dir, const Tree &tree) {
     std::string tree_hash = hash_object(tree);
 
-    int fd = open_content_for_writing(root_dir, tree_hash);
+    // The object is content addressed and only ever appears complete, so if it exists it
+    // already holds this tree
+    if (content_exists(root_dir, tree_hash))
+        return;
+
+    std::string temp_path;
+    int fd = open_temp_content(root_dir, tree_hash, temp_path);
+
+    try {
+        // Serialize the whole tree into one buffer and write it with a single call,
+        // rather than issuing several writes per record
+        const uint32_t num_records = tree.records.size();
+
+        size_t total_size = sizeof(num_records);
+        for (const auto &[name, record] : tree.records) {
+            total_size += sizeof(uint8_t) + 2 * sizeof(uint32_t) + record.hash.size() + record.name.size();
+        }
 
-     try {
-        uint32_t num_records = tree.records.size();
-        if (write(fd, &num_records, sizeof(num_records)) != sizeof(num_records))
-            throw std::runtime_error("Failed to write number of records");
+        std::string buffer;
+        buffer.reserve(total_size);
+        buffer.append(reinterpret_cast<const char *>(&num_records), sizeof(num_records));
 
         for (const auto &[name, record] : tree.records) {
-            save_tree_record(fd, record);
+            append_tree_record(buffer, record);
         }
 
-        flock(fd, LOCK_UN);
-        close(fd);
+        write_all(fd, buffer);
     } catch (const std::exception &e) {
-        delete_content(root_dir, tree_hash);
+        discard_temp_content(fd, temp_path);
         throw;
     }
+
+    publish_content(root_dir, tree_hash, fd, temp_path);
 }
 
 Tree load_tree(const std::string &root_dir, const std::string &tree_hash) {
@@ -135,20 +168,32 @@ std::string read_length_prefixed_string(int fd) {
     return result;
 }
 
-void write_with_length(int fd, const std::string &data) {
-    uint32_t length = data.length();
-    if (write(fd, &length, sizeof(length)) != sizeof(length) || write(fd, data.c_str(), length) != static_cast<ssize_t>(length)) {
-        throw std::runtime_error("Failed to write string");
-    }
+void append_with_length(std::string &buffer, const std::string &data) {
+    if (data.length() > MAX_LENGTH)
+        throw std::runtime_error("Length exceeds maximum");
+
+    const uint32_t length = data.length();
+    buffer.append(reinterpret_cast<const char *>(&length), sizeof(length));
+    buffer.append(data);
 }
 
-void save_tree_record(int fd, const TreeRecord &record) {
-    uint8_t type = static_cast<uint8_t>(record.type);
-    if (write(fd, &type, sizeof(type)) != sizeof(type))
-        throw std::runtime_error("Failed to write type");
+void write_all(int fd, const std::string &buffer) {
+    size_t written = 0;
+    while (written < buffer.size()) {
+        ssize_t result = write(fd, buffer.data() + written, buffer.size() - written);
+        if (result < 0) {
+            if (errno == EINTR)
+                continue;
+            throw std::runtime_error("Failed to write object");
+        }
+        written += result;
+    }
+}
 
-    write_with_length(fd, record.hash);
-    write_with_length(fd, record.name);
+void append_tree_record(std::string &buffer, const TreeRecord &record) {
+    buffer.push_back(static_cast<char>(static_cast<uint8_t>(record.type)));
+    append_with_length(buffer, record.hash);
+    append_with_length(buffer, record.name);
 }
 
 TreeRecord load_tree_record(int fd) {
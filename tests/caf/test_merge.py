@@ -1,8 +1,8 @@
 import time
 from libcaf import Commit
-from libcaf.repository import Repository
+from libcaf.repository import Repository, branch_ref
 from caf.merge import merge, MergeCase
-from libcaf.plumbing import hash_object, save_commit
+from libcaf.plumbing import delete_content, hash_object, save_commit
 from libcaf.ref import HashRef
 
 
@@ -37,6 +37,20 @@ def test_merge_fast_forward(temp_repo):
     assert result == MergeCase.FAST_FORWARD
     assert temp_repo.head_commit() == child_target_ref
 
+def test_merge_fast_forward_to_branch(temp_repo):
+    root_head = temp_repo.commit_working_dir(author="Test Author", message="A")
+
+    child_target = Commit("tree_hash", "Test Author", "B", int(time.time()), [root_head])
+    child_target_ref = HashRef(hash_object(child_target))
+    save_commit(temp_repo.objects_dir(), child_target)
+
+    temp_repo.add_branch("feature")
+    temp_repo.update_ref(branch_ref("feature"), child_target_ref)
+
+    result = merge(temp_repo, branch_ref("feature"))
+    assert result == MergeCase.FAST_FORWARD
+    assert temp_repo.head_commit() == child_target_ref
+
 def test_merge_three_way(temp_repo):
     base = temp_repo.commit_working_dir(author="Test Author", message="A")
     left = temp_repo.commit_working_dir(author="Test Author", message="B")
@@ -49,3 +63,19 @@ def test_merge_three_way(temp_repo):
     result = merge(temp_repo, right)
     assert result == MergeCase.THREE_WAY
     assert temp_repo.head_commit() == left
+
+def test_merge_diverged_histories_does_not_walk_old_history(temp_repo):
+    old = temp_repo.commit_working_dir(author="Test Author", message="A")
+    base = temp_repo.commit_working_dir(author="Test Author", message="B")
+    temp_repo.commit_working_dir(author="Test Author", message="C")
+
+    target = Commit("tree_hash", "Test Author", "D", int(time.time()), [base])
+    target_ref = HashRef(hash_object(target))
+    save_commit(temp_repo.objects_dir(), target)
+
+    # The merge base is found from generation numbers recorded by the commits above, so
+    # nothing older than it is ever loaded
+    delete_content(temp_repo.objects_dir(), old)
+
+    result = merge(Repository(temp_repo.working_dir, temp_repo.repo_dir), target_ref)
+    assert result == MergeCase.THREE_WAY
@@ -11,14 +11,14 @@ import time
 def test_same_commit(temp_repo: Repository) -> None:
     a = temp_repo.commit_working_dir(author="Test Author", message="A")
 
-    assert find_common_ancestor(temp_repo.working_dir, a, a) == a
+    assert find_common_ancestor(temp_repo.objects_dir(), a, a) == a
 
 
 def test_direct_ancestor(temp_repo: Repository) -> None:
     parent = temp_repo.commit_working_dir(author="Test Author", message="A")
     child = temp_repo.commit_working_dir(author="Test Author", message="B")
 
-    assert find_common_ancestor(temp_repo.working_dir, parent, child) == parent
+    assert find_common_ancestor(temp_repo.objects_dir(), parent, child) == parent
 
 
 def test_linear_history(temp_repo: Repository) -> None:
@@ -26,9 +26,9 @@ def test_linear_history(temp_repo: Repository) -> None:
     child = temp_repo.commit_working_dir(author="Test Author", message="B")
     grandchild = temp_repo.commit_working_dir(author="Test Author",message="C")
 
-    assert find_common_ancestor(temp_repo.working_dir, child, grandchild) == child
+    assert find_common_ancestor(temp_repo.objects_dir(), child, grandchild) == child
 
-def test_disconnected_histories(temp_repo, temp_repo_dir) -> None:
+def test_disconnected_histories(temp_repo: Repository) -> None:
     root1 = temp_repo.commit_working_dir(author="Test Author", message="A")
     child1 = temp_repo.commit_working_dir(author="Test Author", message="B")
 
@@ -38,10 +38,10 @@ def test_disconnected_histories(temp_repo, temp_repo_dir) -> None:
     root2 = HashRef(hash_object(commit))
     save_commit(temp_repo.objects_dir(), commit)
 
-    assert find_common_ancestor(temp_repo_dir, root1, root2) is None
+    assert find_common_ancestor(temp_repo.objects_dir(), root1, root2) is None
 
 
-def test_common_ancestor_diverged_history(temp_repo: Repository, temp_repo_dir) -> None:
+def test_common_ancestor_diverged_history(temp_repo: Repository) -> None:
     base = temp_repo.commit_working_dir(author="Test Author", message="A")
 
     left = temp_repo.commit_working_dir(author="Test Author", message="B")
@@ -51,4 +51,35 @@ def test_common_ancestor_diverged_history(temp_repo: Repository, temp_repo_dir)
     right = HashRef(hash_object(commit))
     save_commit(temp_repo.objects_dir(), commit)
 
-    assert find_common_ancestor(temp_repo_dir, left, right) == base
+    assert find_common_ancestor(temp_repo.objects_dir(), left, right) == base
+
+
+def test_common_ancestor_diamond_history(temp_repo: Repository) -> None:
+    base = temp_repo.commit_working_dir(author="Test Author", message="A")
+
+    def _save(message: str, parents: list[HashRef]) -> HashRef:
+        commit = Commit("tree_hash", "Test Author", message, int(time.time()), parents)
+        save_commit(temp_repo.objects_dir(), commit)
+        return HashRef(hash_object(commit))
+
+    left = _save("B", [base])
+    right = _save("C", [base])
+    merged = _save("D", [left, right])
+    tip = _save("E", [merged])
+    other = _save("F", [right])
+
+    assert find_common_ancestor(temp_repo.objects_dir(), tip, other) == right
+
+
+def test_common_ancestor_is_second_parent_of_merge(temp_repo: Repository) -> None:
+    base = temp_repo.commit_working_dir(author="Test Author", message="A")
+
+    def _save(message: str, parents: list[HashRef]) -> HashRef:
+        commit = Commit("tree_hash", "Test Author", message, int(time.time()), parents)
+        save_commit(temp_repo.objects_dir(), commit)
+        return HashRef(hash_object(commit))
+
+    side = _save("B", [base])
+    merged = _save("C", [base, side])
+
+    assert find_common_ancestor(temp_repo.objects_dir(), merged, side) == side
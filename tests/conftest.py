@@ -1,9 +1,28 @@
+import hashlib
+import os
+import shutil
+import sys
 from collections.abc import Callable
 from pathlib import Path
 from random import choice
+from typing import Any
 
+from libcaf.plumbing import hash_object, open_content_for_writing, save_commit, save_tree
+from libcaf.ref import HashRef, SymRef
 from libcaf.repository import Repository
-from pytest import CaptureFixture, FixtureRequest, TempPathFactory, fixture
+from pytest import CaptureFixture, Config, FixtureRequest, TempPathFactory, fixture
+
+from libcaf import Commit, Tree, TreeRecord, TreeRecordType
+
+_SHM_DIR = Path('/dev/shm')  # noqa: S108
+
+
+def pytest_configure(config: Config) -> None:
+    # The tests are dominated by small file operations, so on Linux their temporary directories go on
+    # the shared-memory tmpfs unless a base directory was chosen explicitly. Pytest still numbers,
+    # locks and prunes the directories there as it does under the default temporary root.
+    if sys.platform == 'linux' and config.option.basetemp is None and os.access(_SHM_DIR, os.W_OK):
+        os.environ.setdefault('PYTEST_DEBUG_TEMPROOT', str(_SHM_DIR))
 
 
 def _random_string(length: int) -> str:
@@ -15,14 +34,81 @@ def temp_repo_dir(tmp_path_factory: TempPathFactory) -> Path:
     return tmp_path_factory.mktemp('test_repo', numbered=True)
 
 
+@fixture(scope='session')
+def repo_template(tmp_path_factory: TempPathFactory) -> Path:
+    # Initialize a pristine repository once per session; each test gets its own copy of it.
+    # The files are copied rather than hard linked because refs are rewritten in place.
+    template = Repository(working_dir=tmp_path_factory.mktemp('repo_template'))
+    template.init()
+
+    return template.repo_path()
+
+
 @fixture
-def temp_repo(temp_repo_dir: Path) -> Repository:
+def temp_repo(temp_repo_dir: Path, repo_template: Path) -> Repository:
     repo = Repository(working_dir=temp_repo_dir)
-    repo.init()
+    shutil.copytree(repo_template, repo.repo_path())
 
     return repo
 
 
+@fixture
+def make_commit() -> Callable[[Repository, dict[str, bytes | None], str], HashRef]:
+    # Commit a snapshot straight to the objects directory, without writing or scanning a working directory.
+    # Files are given by their '/'-separated paths relative to the working directory, and a path mapped
+    # to None is an empty directory.
+    def _save_tree(repo: Repository, entries: dict[str, Any]) -> str:
+        records = {}
+        for name, entry in entries.items():
+            if isinstance(entry, dict):
+                records[name] = TreeRecord(TreeRecordType.TREE, _save_tree(repo, entry), name)
+            else:
+                blob_hash = hashlib.sha1(entry).hexdigest()  # noqa: S324
+                with open_content_for_writing(repo.objects_dir(), blob_hash) as f:
+                    f.write(entry)
+                records[name] = TreeRecord(TreeRecordType.BLOB, blob_hash, name)
+
+        tree = Tree(records)
+        save_tree(repo.objects_dir(), tree)
+
+        return hash_object(tree)
+
+    def _make_commit(repo: Repository, files: dict[str, bytes | None], message: str = 'Commit') -> HashRef:
+        entries: dict[str, Any] = {}
+        for path, content in files.items():
+            *dir_names, name = path.split('/')
+            node = entries
+            for dir_name in dir_names:
+                node = node.setdefault(dir_name, {})
+            node[name] = {} if content is None else content
+
+        parent = repo.head_commit()
+        commit = Commit(_save_tree(repo, entries), 'Tester', message, 1234567890, [] if parent is None else [parent])
+        save_commit(repo.objects_dir(), commit)
+        commit_ref = hash_object(commit)
+
+        head_ref = repo.head_ref()
+        if isinstance(head_ref, SymRef):
+            repo.update_ref(head_ref, commit_ref)
+
+        return commit_ref
+
+    return _make_commit
+
+
+@fixture
+def populate() -> Callable[[Path, dict[str, bytes]], None]:
+    # Write files given by their '/'-separated paths under a root, creating each directory once
+    def _populate(root: Path, files: dict[str, bytes]) -> None:
+        for dir_path in {Path(path).parent for path in files}:
+            (root / dir_path).mkdir(parents=True, exist_ok=True)
+
+        for path, content in files.items():
+            (root / path).write_bytes(content)
+
+    return _populate
+
+
 @fixture
 def temp_content_length() -> int:
     return 100
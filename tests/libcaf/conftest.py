@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from functools import cached_property
+
+from libcaf.plumbing import hash_object
+from pytest import fixture
+
+from libcaf import Blob, Commit, Tree, TreeRecord, TreeRecordType
+
+
+@dataclass
+class HashedObject:
+    obj: Blob | Commit | Tree
+
+    @cached_property
+    def hash(self) -> str:
+        return hash_object(self.obj)
+
+
+@fixture(scope='module')
+def sample_blob() -> HashedObject:
+    return HashedObject(Blob('1234567890abcdef'))
+
+
+@fixture(scope='module')
+def sample_commit_with_parent() -> HashedObject:
+    return HashedObject(Commit('1234567890abcdef', 'Author', 'Initial commit', 1234567890, ['3234567890abcdef']))
+
+
+@fixture(scope='module')
+def sample_commit_no_parent() -> HashedObject:
+    return HashedObject(Commit('1234567890abcdef', 'Author', 'Initial commit', 1234567890, []))
+
+
+@fixture(scope='module')
+def sample_tree_two_records() -> HashedObject:
+    record1 = TreeRecord(TreeRecordType.TREE, '1234567890abcdef', 'record1')
+    record2 = TreeRecord(TreeRecordType.BLOB, 'abcdef1234567890', 'record2')
+
+    return HashedObject(Tree({'record1': record1, 'record2': record2}))
@@ -36,3 +36,30 @@ def test_build_tree_from_fs_is_deterministic_and_dfs(temp_repo: Repository) -> N
 
     subtree = subtrees[subtree_hash]
     assert list(subtree.records.keys()) == sorted(subtree.records.keys())
+
+
+def test_build_tree_from_fs_hard_links_match_save_dir(temp_repo: Repository) -> None:
+    wd = temp_repo.working_dir
+
+    (wd / "a.txt").write_text("shared", encoding="utf-8")
+    (wd / "sub").mkdir()
+    (wd / "sub" / "b.txt").hardlink_to(wd / "a.txt")
+
+    _, tree_hash, _ = build_tree_from_fs(wd, temp_repo.repo_dir.name)
+
+    assert tree_hash == temp_repo.save_dir(wd)
+
+
+def test_build_tree_from_fs_ignores_listing_order(temp_repo: Repository) -> None:
+    wd = temp_repo.working_dir
+    names = ["c.txt", "a.txt", "b.txt"]
+
+    # The same files created in opposite orders, so directory reads are unlikely to list them alike
+    for dir_name, order in (("forward", names), ("backward", names[::-1])):
+        (wd / dir_name).mkdir()
+        for name in order:
+            (wd / dir_name / name).write_text(name, encoding="utf-8")
+
+    tree, _, _ = build_tree_from_fs(wd, temp_repo.repo_dir.name)
+
+    assert tree.records["forward"].hash == tree.records["backward"].hash
@@ -0,0 +1,125 @@
+import time
+
+from libcaf import Commit, commit_graph
+from libcaf.constants import DEFAULT_BRANCH, HASH_LENGTH
+from libcaf.plumbing import delete_content, hash_object, save_commit
+from libcaf.ref import HashRef
+from libcaf.repository import Repository, branch_ref
+from pytest import raises
+
+
+def _save(repo: Repository, message: str, parents: list[HashRef]) -> HashRef:
+    commit = Commit('tree_hash', 'Test Author', message, int(time.time()), parents)
+    save_commit(repo.objects_dir(), commit)
+    return HashRef(hash_object(commit))
+
+
+def test_commit_graph_generations(temp_repo: Repository) -> None:
+    root = temp_repo.commit_working_dir('Test Author', 'A')
+    left = _save(temp_repo, 'B', [root])
+    right = _save(temp_repo, 'C', [left])
+    merged = _save(temp_repo, 'D', [left, right])
+
+    graph = temp_repo.commit_graph()
+
+    assert graph.generation(root) == 1
+    assert graph.generation(left) == 2
+    assert graph.generation(right) == 3
+    assert graph.generation(merged) == 4
+    assert graph.parents(merged) == [left, right]
+
+
+def test_commit_graph_is_shared(temp_repo: Repository) -> None:
+    commit_ref = temp_repo.commit_working_dir('Test Author', 'A')
+    graph = temp_repo.commit_graph()
+
+    assert temp_repo.commit_graph() is graph
+    assert graph.parents(commit_ref) == []
+
+
+def test_commit_graph_missing_commit_raises_error(temp_repo: Repository) -> None:
+    with raises(RuntimeError):
+        temp_repo.commit_graph().parents(HashRef('a' * HASH_LENGTH))
+
+
+def test_commit_graph_roots(temp_repo: Repository) -> None:
+    root1 = temp_repo.commit_working_dir('Test Author', 'A')
+    child = _save(temp_repo, 'B', [root1])
+    root2 = _save(temp_repo, 'C', [])
+    merged = _save(temp_repo, 'D', [child, root2])
+
+    graph = temp_repo.commit_graph()
+
+    assert graph.roots(root1) == {root1}
+    assert graph.roots(child) == {root1}
+    assert graph.roots(root2) == {root2}
+    assert graph.roots(merged) == {root1, root2}
+
+
+def test_commit_graph_file_persists_generations(temp_repo: Repository) -> None:
+    first = temp_repo.commit_working_dir('Test Author', 'A')
+    second = temp_repo.commit_working_dir('Test Author', 'B')
+
+    graph = Repository(temp_repo.working_dir, temp_repo.repo_dir).commit_graph()
+
+    assert graph.generation(first) == 1
+    assert graph.generation(second) == 2
+    assert graph.roots(second) == {first}
+
+
+def test_commit_graph_file_persists_roots(temp_repo: Repository) -> None:
+    first = temp_repo.commit_working_dir('Test Author', 'A')
+    second = temp_repo.commit_working_dir('Test Author', 'B')
+    assert temp_repo.commit_graph().known_roots(second) == {first}
+
+    graph = Repository(temp_repo.working_dir, temp_repo.repo_dir).commit_graph()
+
+    # Known straight from the roots file, before any commit is loaded
+    assert graph.known_roots(first) == {first}
+    assert graph.known_roots(second) == {first}
+
+
+def test_commit_graph_roots_unknown_without_walk(temp_repo: Repository) -> None:
+    root = _save(temp_repo, 'A', [])
+    child = _save(temp_repo, 'B', [root])
+
+    graph = temp_repo.commit_graph()
+
+    assert graph.known_roots(child) is None
+    assert graph.roots(child) == {root}
+    assert graph.known_roots(child) == {root}
+
+
+def test_commit_skips_graph_record_without_known_history(temp_repo: Repository) -> None:
+    root = _save(temp_repo, 'A', [])
+    parent = _save(temp_repo, 'B', [root])
+    temp_repo.update_ref(branch_ref(DEFAULT_BRANCH), parent)
+    # History the commit graph has never seen, with an ancestor that cannot be read
+    delete_content(temp_repo.objects_dir(), root)
+
+    commit_ref = temp_repo.commit_working_dir('Test Author', 'C')
+
+    assert temp_repo.head_commit() == commit_ref
+    assert not temp_repo.commit_graph_file().exists()
+
+
+def test_commit_graph_remembers_bounded_merge_bases(temp_repo: Repository) -> None:
+    graph = temp_repo.commit_graph()
+    calls: list[int] = []
+
+    def _find(index: int) -> str:
+        calls.append(index)
+        return f'base{index}'
+
+    assert graph.merge_base('head', 'tip0', lambda: _find(0)) == 'base0'
+    assert graph.merge_base('head', 'tip0', lambda: _find(0)) == 'base0'
+    assert calls == [0]
+
+    # Filling the cache past its bound evicts the least recently used pair first
+    size = commit_graph._MERGE_BASE_CACHE_SIZE  # noqa: SLF001
+    for index in range(1, size + 1):
+        graph.merge_base('head', f'tip{index}', lambda index=index: _find(index))
+    graph.merge_base('head', 'tip0', lambda: _find(0))
+
+    assert calls[-1] == 0
+    assert len(calls) == size + 2
@@ -1,4 +1,6 @@
 import hashlib
+import os
+import stat
 from pathlib import Path
 
 from libcaf.plumbing import (delete_content, hash_file, open_content_for_reading, open_content_for_writing,
@@ -18,6 +20,21 @@ class TestNonExistentContent:
         delete_content(temp_repo_dir, non_existent_hash)
 
 
+@mark.parametrize('umask', [0o022, 0o077])
+def test_saved_objects_respect_umask(temp_repo_dir: Path, umask: int) -> None:
+    file = temp_repo_dir / 'file.txt'
+    file.write_text('Content')
+
+    previous_umask = os.umask(umask)
+    try:
+        blob = save_file_content(temp_repo_dir / 'objects', file)
+    finally:
+        os.umask(previous_umask)
+
+    saved_file = temp_repo_dir / 'objects' / blob.hash[:2] / blob.hash
+    assert stat.S_IMODE(saved_file.stat().st_mode) == 0o644 & ~umask
+
+
 @mark.parametrize('temp_content_length', [0, 1, 10, 100, 1000, 10000, 100000, 1000000])
 class TestContent:
     def test_hash_file(self, temp_content: tuple[Path, str]) -> None:
@@ -38,6 +55,7 @@ class TestContent:
 
         saved_content = saved_file.read_bytes()
         assert saved_content == expected_content
+        assert list(saved_file.parent.iterdir()) == [saved_file]
 
     def test_open_content_for_reading(self, temp_repo_dir: Path, temp_content: tuple[Path, str]) -> None:
         file, expected_content = temp_content
@@ -1,81 +1,78 @@
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
 from pathlib import Path
-from libcaf.repository import (AddedDiff, Diff, ModifiedDiff, MovedFromDiff, MovedToDiff, RemovedDiff, Repository)
 
-def test_diff_commit_vs_dir_detects_added(temp_repo: Repository) -> None:
-    (temp_repo.working_dir / "a.txt").write_text("a", encoding="utf-8")
-    base = temp_repo.commit_working_dir("Tester", "base")
+from pytest import mark
 
-    # Add a new file in working dir but do not commit
-    (temp_repo.working_dir / "b.txt").write_text("b", encoding="utf-8")
+from libcaf.ref import HashRef
+from libcaf.repository import (AddedDiff, Diff, ModifiedDiff, MovedFromDiff, MovedToDiff, RemovedDiff, Repository)
 
-    diffs = temp_repo.diff(base, temp_repo.working_dir)
-    added, _, _, _, _ = split_diffs_by_type(diffs)
+MakeCommit = Callable[[Repository, dict[str, bytes | None], str], HashRef]
 
-    assert len(added) == 1
-    assert added[0].record.name == "b.txt"
-    
-    
-def test_diff_dir_vs_commit_detects_added(temp_repo: Repository) -> None:
-    (temp_repo.working_dir / "a.txt").write_text("a", encoding="utf-8")
-    commit = temp_repo.commit_working_dir("Tester", "base")
+_BUCKETS = (AddedDiff, ModifiedDiff, MovedToDiff, MovedFromDiff, RemovedDiff)
 
-    # Add a new file in working dir but do not commit
-    (temp_repo.working_dir / "b.txt").write_text("b", encoding="utf-8")
 
-    diffs = temp_repo.diff(temp_repo.working_dir, commit)
-    _, _, _, _, removed = split_diffs_by_type(diffs)
+# The files before and after the change, and the kind and name of the single diff expected between them
+Files = tuple[dict[str, bytes], dict[str, bytes]]
+Expected = tuple[type[Diff], str]
+Populate = Callable[[Path, dict[str, bytes]], None]
 
-    assert len(removed) == 1
-    assert removed[0].record.name == "b.txt"
 
+def assert_single_diff(diffs: Sequence[Diff], expected: Expected) -> None:
+    bucket, name = expected
+    for diff_type, diffs_of_type in zip(_BUCKETS, split_diffs_by_type(diffs), strict=True):
+        if diff_type is bucket:
+            assert [d.record.name for d in diffs_of_type] == [name]
+        else:
+            assert diffs_of_type == []
 
-def test_diff_dir_vs_commit_detects_removed(temp_repo: Repository) -> None:
-    (temp_repo.working_dir / "a.txt").write_text("a", encoding="utf-8")
-    commit = temp_repo.commit_working_dir("Tester", "base")
 
-    # Remove file in working dir but do not commit
-    (temp_repo.working_dir / "a.txt").unlink()
+@mark.parametrize(('files', 'expected'), [
+    (({'file1.txt': b'Content 1'}, {'file1.txt': b'Content 1', 'file2.txt': b'Content 2'}), (AddedDiff, 'file2.txt')),
+    (({'file.txt': b'Content'}, {}), (RemovedDiff, 'file.txt')),
+    (({'file.txt': b'Old content'}, {'file.txt': b'New content'}), (ModifiedDiff, 'file.txt')),
+], ids=['added_file', 'removed_file', 'modified_file'])
+def test_diff_commit_vs_commit(temp_repo: Repository, make_commit: MakeCommit, files: Files,
+                               expected: Expected) -> None:
+    base = make_commit(temp_repo, files[0], 'base')
+    changed = make_commit(temp_repo, files[1], 'changed')
 
-    diffs = temp_repo.diff(commit, temp_repo.working_dir)
-    _, _, _, _, removed = split_diffs_by_type(diffs)
+    assert_single_diff(temp_repo.diff(base, changed), expected)
 
-    assert len(removed) == 1
-    assert removed[0].record.name == "a.txt"
 
+@mark.parametrize(('files', 'expected'), [
+    (({'a.txt': b'a'}, {'a.txt': b'a', 'b.txt': b'b'}), (AddedDiff, 'b.txt')),
+    (({'a.txt': b'a'}, {}), (RemovedDiff, 'a.txt')),
+    (({'a.txt': b'old'}, {'a.txt': b'new'}), (ModifiedDiff, 'a.txt')),
+], ids=['added_file', 'removed_file', 'modified_file'])
+def test_diff_commit_vs_dir(temp_repo: Repository, make_commit: MakeCommit, populate: Populate, files: Files,
+                            expected: Expected) -> None:
+    base = make_commit(temp_repo, files[0], 'base')
+    populate(temp_repo.working_dir, files[1])
 
-def test_diff_dir_vs_dir_detects_modified(temp_repo: Repository, tmp_path: Path) -> None:
-    dir1 = tmp_path / "d1"
-    dir2 = tmp_path / "d2"
-    dir1.mkdir()
-    dir2.mkdir()
+    assert_single_diff(temp_repo.diff(base, temp_repo.working_dir), expected)
 
-    (dir1 / "a.txt").write_text("old", encoding="utf-8")
-    (dir2 / "a.txt").write_text("new", encoding="utf-8")
 
-    diffs = temp_repo.diff(dir1, dir2)
-    added, modified, moved_to, moved_from, removed = split_diffs_by_type(diffs)
+@mark.parametrize(('files', 'expected'), [
+    # A file only the working directory has is missing from the commit it is compared to
+    (({'a.txt': b'a'}, {'a.txt': b'a', 'b.txt': b'b'}), (RemovedDiff, 'b.txt')),
+], ids=['removed_file'])
+def test_diff_dir_vs_commit(temp_repo: Repository, make_commit: MakeCommit, populate: Populate, files: Files,
+                            expected: Expected) -> None:
+    base = make_commit(temp_repo, files[0], 'base')
+    populate(temp_repo.working_dir, files[1])
 
-    assert added == []
-    assert moved_to == []
-    assert moved_from == []
-    assert removed == []
+    assert_single_diff(temp_repo.diff(temp_repo.working_dir, base), expected)
 
-    assert len(modified) == 1
-    assert modified[0].record.name == "a.txt"
-    
-    
-def test_diff_commit_vs_dir_detects_modified(temp_repo: Repository) -> None:
-    (temp_repo.working_dir / "a.txt").write_text("old", encoding="utf-8")
-    base = temp_repo.commit_working_dir("Tester", "base")
 
-    (temp_repo.working_dir / "a.txt").write_text("new", encoding="utf-8")
+@mark.parametrize(('files', 'expected'), [
+    (({'a.txt': b'old'}, {'a.txt': b'new'}), (ModifiedDiff, 'a.txt')),
+], ids=['modified_file'])
+def test_diff_dir_vs_dir(temp_repo: Repository, tmp_path: Path, populate: Populate, files: Files,
+                         expected: Expected) -> None:
+    populate(tmp_path / 'd1', files[0])
+    populate(tmp_path / 'd2', files[1])
 
-    diffs = temp_repo.diff(base, temp_repo.working_dir)
-    _, modified, _, _, _ = split_diffs_by_type(diffs)
-
-    assert len(modified) == 1
-    assert modified[0].record.name == "a.txt"
+    assert_single_diff(temp_repo.diff(tmp_path / 'd1', tmp_path / 'd2'), expected)
 
 
 def split_diffs_by_type(diffs: Sequence[Diff]) -> \
@@ -84,18 +81,18 @@ def split_diffs_by_type(diffs: Sequence[Diff]) -> \
         list[MovedToDiff],
         list[MovedFromDiff],
         list[RemovedDiff]]:
-    added = [d for d in diffs if isinstance(d, AddedDiff)]
-    moved_to = [d for d in diffs if isinstance(d, MovedToDiff)]
-    moved_from = [d for d in diffs if isinstance(d, MovedFromDiff)]
-    removed = [d for d in diffs if isinstance(d, RemovedDiff)]
-    modified = [d for d in diffs if isinstance(d, ModifiedDiff)]
+    buckets: dict[type[Diff], list[Diff]] = {AddedDiff: [], ModifiedDiff: [], MovedToDiff: [], MovedFromDiff: [],
+                                             RemovedDiff: []}
+    for d in diffs:
+        buckets[type(d)].append(d)
 
-    return added, modified, moved_to, moved_from, removed
+    return (buckets[AddedDiff], buckets[ModifiedDiff], buckets[MovedToDiff],  # type: ignore[return-value]
+            buckets[MovedFromDiff], buckets[RemovedDiff])
 
 
 def test_diff_head(temp_repo: Repository) -> None:
     file_path = temp_repo.working_dir / 'file.txt'
-    file_path.write_text('Same content')
+    file_path.write_bytes(b'Same content')
 
     temp_repo.commit_working_dir('Tester', 'Initial commit')
     diff_result = temp_repo.diff()
@@ -105,7 +102,7 @@ def test_diff_head(temp_repo: Repository) -> None:
 
 def test_diff_identical_commits(temp_repo: Repository) -> None:
     file_path = temp_repo.working_dir / 'file.txt'
-    file_path.write_text('Same content')
+    file_path.write_bytes(b'Same content')
 
     commit_hash = temp_repo.commit_working_dir('Tester', 'Initial commit')
     diff_result = temp_repo.diff(commit_hash, 'HEAD')
@@ -113,79 +110,21 @@ def test_diff_identical_commits(temp_repo: Repository) -> None:
     assert len(diff_result) == 0
 
 
-def test_diff_added_file(temp_repo: Repository) -> None:
-    file1 = temp_repo.working_dir / 'file1.txt'
-    file1.write_text('Content 1')
-    commit1_hash = temp_repo.commit_working_dir('Tester', 'Initial commit')
-
-    file2 = temp_repo.working_dir / 'file2.txt'
-    file2.write_text('Content 2')
-    temp_repo.commit_working_dir('Tester', 'Added file2')
-
-    diff_result = temp_repo.diff(commit1_hash)
-    added, modified, moved_to, moved_from, removed = \
-        split_diffs_by_type(diff_result)
-
-    assert len(added) == 1
-    assert added[0].record.name == 'file2.txt'
-
-    assert len(moved_to) == 0
-    assert len(moved_from) == 0
-    assert len(removed) == 0
-    assert len(modified) == 0
-
-
-def test_diff_removed_file(temp_repo: Repository) -> None:
-    file1 = temp_repo.working_dir / 'file.txt'
-    file1.write_text('Content')
-    commit1_hash = temp_repo.commit_working_dir('Tester', 'File created')
-
-    file1.unlink()  # Delete the file.
-    temp_repo.commit_working_dir('Tester', 'File deleted')
-
-    diff_result = temp_repo.diff(commit1_hash)
-    added, modified, moved_to, moved_from, removed = \
-        split_diffs_by_type(diff_result)
-
-    assert len(added) == 0
-    assert len(moved_to) == 0
-    assert len(moved_from) == 0
-    assert len(modified) == 0
-
-    assert len(removed) == 1
-    assert removed[0].record.name == 'file.txt'
-
-
-def test_diff_modified_file(temp_repo: Repository) -> None:
-    file1 = temp_repo.working_dir / 'file.txt'
-    file1.write_text('Old content')
-    commit1 = temp_repo.commit_working_dir('Tester', 'Original commit')
-
-    file1.write_text('New content')
-    commit2 = temp_repo.commit_working_dir('Tester', 'Modified file')
-
-    diff_result = temp_repo.diff(commit1, commit2)
-    added, modified, moved_to, moved_from, removed = \
-        split_diffs_by_type(diff_result)
-
-    assert len(added) == 0
-    assert len(moved_to) == 0
-    assert len(moved_from) == 0
-    assert len(removed) == 0
+def test_diff_different_commits_same_tree(temp_repo: Repository) -> None:
+    file_path = temp_repo.working_dir / 'file.txt'
+    file_path.write_bytes(b'Same content')
 
-    assert len(modified) == 1
-    assert modified[0].record.name == 'file.txt'
+    commit1_hash = temp_repo.commit_working_dir('Tester', 'Initial commit')
+    commit2_hash = temp_repo.commit_working_dir('Tester', 'No-op commit')
+    assert commit1_hash != commit2_hash
 
+    assert len(temp_repo.diff(commit1_hash, commit2_hash)) == 0
+    assert len(temp_repo.diff(commit1_hash, temp_repo.working_dir)) == 0
 
-def test_diff_nested_directory(temp_repo: Repository) -> None:
-    subdir = temp_repo.working_dir / 'subdir'
-    subdir.mkdir()
-    nested_file = subdir / 'file.txt'
-    nested_file.write_text('Initial')
-    commit1 = temp_repo.commit_working_dir('Tester', 'Commit with subdir')
 
-    nested_file.write_text('Modified')
-    commit2 = temp_repo.commit_working_dir('Tester', 'Modified nested file')
+def test_diff_nested_directory(temp_repo: Repository, make_commit: MakeCommit) -> None:
+    commit1 = make_commit(temp_repo, {'subdir/file.txt': b'Initial'}, 'Commit with subdir')
+    commit2 = make_commit(temp_repo, {'subdir/file.txt': b'Modified'}, 'Modified nested file')
 
     diff_result = temp_repo.diff(commit1, commit2)
     added, modified, moved_to, moved_from, removed = \
@@ -202,25 +141,9 @@ def test_diff_nested_directory(temp_repo: Repository) -> None:
     assert modified[0].children[0].record.name == 'file.txt'
 
 
-def test_diff_nested_trees(temp_repo: Repository) -> None:
-    dir1 = temp_repo.working_dir / 'dir1'
-    dir1.mkdir()
-    file_a = dir1 / 'file_a.txt'
-    file_a.write_text('A1')
-
-    dir2 = temp_repo.working_dir / 'dir2'
-    dir2.mkdir()
-    file_b = dir2 / 'file_b.txt'
-    file_b.write_text('B1')
-
-    commit1 = temp_repo.commit_working_dir('Tester', 'Initial nested commit')
-
-    file_a.write_text('A2')
-    file_b.unlink()
-    file_c = dir2 / 'file_c.txt'
-    file_c.write_text('C1')
-
-    commit2 = temp_repo.commit_working_dir('Tester', 'Updated nested commit')
+def test_diff_nested_trees(temp_repo: Repository, make_commit: MakeCommit) -> None:
+    commit1 = make_commit(temp_repo, {'dir1/file_a.txt': b'A1', 'dir2/file_b.txt': b'B1'}, 'Initial nested commit')
+    commit2 = make_commit(temp_repo, {'dir1/file_a.txt': b'A2', 'dir2/file_c.txt': b'C1'}, 'Updated nested commit')
 
     diff_result = temp_repo.diff(commit1, commit2)
     added, modified, moved_to, moved_from, removed = \
@@ -246,22 +169,10 @@ def test_diff_nested_trees(temp_repo: Repository) -> None:
     assert isinstance(modified[1].children[1], AddedDiff)
 
 
-def test_diff_moved_file_added_first(temp_repo: Repository) -> None:
-    dir1 = temp_repo.working_dir / 'dir1'
-    dir1.mkdir()
-    file_a = dir1 / 'file_a.txt'
-    file_a.write_text('A1')
-
-    dir2 = temp_repo.working_dir / 'dir2'
-    dir2.mkdir()
-    file_b = dir2 / 'file_b.txt'
-    file_b.write_text('B1')
-
-    commit1 = temp_repo.commit_working_dir('Tester', 'Initial nested commit')
-
-    file_a.rename(dir2 / 'file_c.txt')
-
-    commit2 = temp_repo.commit_working_dir('Tester', 'Updated nested commit')
+def test_diff_moved_file_added_first(temp_repo: Repository, make_commit: MakeCommit) -> None:
+    commit1 = make_commit(temp_repo, {'dir1/file_a.txt': b'A1', 'dir2/file_b.txt': b'B1'}, 'Initial nested commit')
+    commit2 = make_commit(temp_repo, {'dir1': None, 'dir2/file_b.txt': b'B1', 'dir2/file_c.txt': b'A1'},
+                          'Updated nested commit')
 
     diff_result = temp_repo.diff(commit1, commit2)
     added, modified, moved_to, moved_from, removed = \
@@ -301,22 +212,10 @@ def test_diff_moved_file_added_first(temp_repo: Repository) -> None:
     assert modified_child.moved_from.record.name == 'file_a.txt'
 
 
-def test_diff_moved_file_removed_first(temp_repo: Repository) -> None:
-    dir1 = temp_repo.working_dir / 'dir1'
-    dir1.mkdir()
-    file_a = dir1 / 'file_a.txt'
-    file_a.write_text('A1')
-
-    dir2 = temp_repo.working_dir / 'dir2'
-    dir2.mkdir()
-    file_b = dir2 / 'file_b.txt'
-    file_b.write_text('B1')
-
-    commit1 = temp_repo.commit_working_dir('Tester', 'Initial nested commit')
-
-    file_b.rename(dir1 / 'file_c.txt')
-
-    commit2 = temp_repo.commit_working_dir('Tester', 'Updated nested commit')
+def test_diff_moved_file_removed_first(temp_repo: Repository, make_commit: MakeCommit) -> None:
+    commit1 = make_commit(temp_repo, {'dir1/file_a.txt': b'A1', 'dir2/file_b.txt': b'B1'}, 'Initial nested commit')
+    commit2 = make_commit(temp_repo, {'dir1/file_a.txt': b'A1', 'dir1/file_c.txt': b'B1', 'dir2': None},
+                          'Updated nested commit')
 
     diff_result = temp_repo.diff(commit1, commit2)
     added, modified, moved_to, moved_from, removed = \
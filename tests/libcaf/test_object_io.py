@@ -12,11 +12,7 @@ def test_save_load_commit(temp_repo_dir: Path) -> None:
     save_commit(temp_repo_dir, commit)
     loaded_commit = load_commit(temp_repo_dir, commit_hash)
 
-    assert loaded_commit.tree_hash == commit.tree_hash
-    assert loaded_commit.author == commit.author
-    assert loaded_commit.message == commit.message
-    assert loaded_commit.timestamp == commit.timestamp
-    assert loaded_commit.parents == commit.parents
+    assert loaded_commit == commit
 
 
 def test_save_load_commit_without_parent(temp_repo_dir: Path) -> None:
@@ -26,11 +22,7 @@ def test_save_load_commit_without_parent(temp_repo_dir: Path) -> None:
     save_commit(temp_repo_dir, commit_none_parent)
     loaded_commit_none_parent = load_commit(temp_repo_dir, commit_none_parent_hash)
 
-    assert loaded_commit_none_parent.tree_hash == commit_none_parent.tree_hash
-    assert loaded_commit_none_parent.author == commit_none_parent.author
-    assert loaded_commit_none_parent.message == commit_none_parent.message
-    assert loaded_commit_none_parent.timestamp == commit_none_parent.timestamp
-    assert loaded_commit_none_parent.parents == commit_none_parent.parents
+    assert loaded_commit_none_parent == commit_none_parent
 
 
 def test_save_load_tree(temp_repo_dir: Path) -> None:
@@ -46,4 +38,31 @@ def test_save_load_tree(temp_repo_dir: Path) -> None:
     loaded_tree = load_tree(temp_repo_dir, tree_hash)
 
     assert loaded_tree.records.keys() == records.keys()
-    assert loaded_tree.records == records
+    assert loaded_tree == tree
+
+
+def test_commit_and_tree_equality() -> None:
+    commit = Commit('tree_hash123', 'Author', 'Commit message', 1234567890, ['commithash123parent'])
+    record = TreeRecord(TreeRecordType.BLOB, 'omer123', 'omer')
+
+    assert commit == Commit('tree_hash123', 'Author', 'Commit message', 1234567890, ['commithash123parent'])
+    assert commit != Commit('tree_hash123', 'Author', 'Commit message', 1234567890, [])
+    assert Tree({'omer': record}) == Tree({'omer': record})
+    assert Tree({'omer': record}) != Tree({})
+
+
+def test_equal_commits_and_trees_hash_equal() -> None:
+    record = TreeRecord(TreeRecordType.BLOB, 'omer123', 'omer')
+
+    assert hash(Commit('tree_hash123', 'Author', 'msg', 1, [])) == hash(Commit('tree_hash123', 'Author', 'msg', 1, []))
+    assert len({Tree({'omer': record}), Tree({'omer': record}), Tree({})}) == 2
+
+
+def test_save_leaves_only_complete_objects(temp_repo_dir: Path) -> None:
+    commit = Commit('tree_hash123', 'Author', 'Commit message', 1234567890, [])
+    tree = Tree({'omer': TreeRecord(TreeRecordType.BLOB, 'omer123', 'omer')})
+    save_commit(temp_repo_dir, commit)
+    save_tree(temp_repo_dir, tree)
+
+    saved = sorted(path.name for path in temp_repo_dir.rglob('*') if path.is_file())
+    assert saved == sorted([hash_object(commit), hash_object(tree)])
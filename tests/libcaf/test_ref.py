@@ -1,7 +1,8 @@
+import os
 from pathlib import Path
 
 from libcaf.constants import HASH_LENGTH
-from libcaf.ref import HashRef, RefError, SymRef, read_ref, write_ref
+from libcaf.ref import HashRef, RefError, SymRef, is_hash, read_ref, write_ref
 from pytest import fixture, raises
 
 
@@ -20,6 +21,26 @@ def test_branch_name_multiple_slashes() -> None:
     assert symref.branch_name() == 'feature-branch'
 
 
+
+def test_hash_ref_hashes_like_str() -> None:
+    # Merge-base traversals key sets by HashRef and probe them with the plain str parents
+    # that come back from load_commit, so HashRef must keep str's C-level hashing
+    ref = HashRef('a' * HASH_LENGTH)
+
+    assert HashRef.__hash__ is str.__hash__
+    assert HashRef.__eq__ is str.__eq__
+    assert 'a' * HASH_LENGTH in {ref}
+
+
+def test_is_hash() -> None:
+    assert is_hash('0123456789abcdef' * (HASH_LENGTH // 16) + 'a' * (HASH_LENGTH % 16))
+    assert not is_hash('a' * (HASH_LENGTH - 1))
+    assert not is_hash('a' * (HASH_LENGTH + 1))
+    assert not is_hash('A' * HASH_LENGTH)
+    assert not is_hash('g' * HASH_LENGTH)
+    assert not is_hash('a' * (HASH_LENGTH - 1) + '\n')
+
+
 @fixture
 def ref_file(tmp_path: Path) -> Path:
     return tmp_path / 'ref'
@@ -106,3 +127,38 @@ def test_write_symbolic_ref(ref_file: Path) -> None:
 def test_write_invalid_ref_type_raises_error(ref_file: Path) -> None:
     with raises(RefError):
         write_ref(ref_file, 123)
+
+
+def test_read_ref_after_rewrite(ref_file: Path) -> None:
+    first_ref = HashRef('a' * HASH_LENGTH)
+    second_ref = HashRef('b' * HASH_LENGTH)
+
+    write_ref(ref_file, first_ref)
+    assert read_ref(ref_file) == first_ref
+
+    # Same size, and likely written within the same mtime tick
+    write_ref(ref_file, second_ref)
+    assert read_ref(ref_file) == second_ref
+
+
+def test_read_ref_after_external_rewrite(ref_file: Path) -> None:
+    write_ref(ref_file, HashRef('a' * HASH_LENGTH))
+    assert read_ref(ref_file) == HashRef('a' * HASH_LENGTH)
+
+    # Rewritten in place by another process, with the same size and likely within the same mtime tick
+    ref_file.write_text('b' * HASH_LENGTH)
+    assert read_ref(ref_file) == HashRef('b' * HASH_LENGTH)
+
+
+def test_write_ref_through_alias_invalidates_cached_ref(ref_file: Path) -> None:
+    write_ref(ref_file, HashRef('a' * HASH_LENGTH))
+    alias = ref_file.with_name('alias')
+    alias.hardlink_to(ref_file)
+    # An old mtime lets the read be cached
+    os.utime(ref_file, ns=(0, 0))
+    assert read_ref(alias) == HashRef('a' * HASH_LENGTH)
+
+    write_ref(ref_file, HashRef('b' * HASH_LENGTH))
+    # The stat signature is unchanged, so only the invalidation keeps the read fresh
+    os.utime(ref_file, ns=(0, 0))
+    assert read_ref(alias) == HashRef('b' * HASH_LENGTH)
@@ -1,11 +1,14 @@
+import json
+import os
+from collections.abc import Callable
 from pathlib import Path
 from shutil import rmtree
 
 from libcaf.constants import DEFAULT_BRANCH, HASH_LENGTH
-from libcaf.plumbing import hash_object, load_commit, load_tree
-from libcaf.ref import RefError, SymRef
+from libcaf.plumbing import delete_content, hash_object, load_commit, load_tree
+from libcaf.ref import RefError, SymRef, write_ref
 from libcaf.repository import HashRef, Repository, RepositoryError, branch_ref
-from pytest import raises
+from pytest import mark, raises
 
 
 def test_init_with_custom_repo_dir(temp_repo_dir: Path) -> None:
@@ -96,6 +99,106 @@ def test_save_dir(temp_repo: Repository) -> None:
     assert (objects_dir / tree_ref[:2] / tree_ref).exists()
 
 
+def test_save_dir_reuses_cached_hashes(temp_repo: Repository) -> None:
+    test_file = temp_repo.working_dir / 'test_file.txt'
+    test_file.write_text('Cached content')
+
+    first_tree_ref = temp_repo.save_dir(temp_repo.working_dir)
+    assert temp_repo.hash_cache_file().exists()
+
+    assert temp_repo.save_dir(temp_repo.working_dir) == first_tree_ref
+
+
+def test_save_dir_detects_same_size_change(temp_repo: Repository) -> None:
+    test_file = temp_repo.working_dir / 'test_file.txt'
+    test_file.write_text('Content A')
+    first_tree_ref = temp_repo.save_dir(temp_repo.working_dir)
+
+    # Same size, and likely the same mtime tick as the cache write
+    test_file.write_text('Content B')
+    second_tree_ref = temp_repo.save_dir(temp_repo.working_dir)
+
+    assert second_tree_ref != first_tree_ref
+    record = load_tree(temp_repo.objects_dir(), second_tree_ref).records['test_file.txt']
+    assert record.hash == hash_object(temp_repo.save_file_content(test_file))
+
+
+def test_save_dir_resaves_deleted_cached_blob(temp_repo: Repository) -> None:
+    test_file = temp_repo.working_dir / 'test_file.txt'
+    test_file.write_text('Cached content')
+    # An old mtime lets the cache trust the entry on the next save
+    os.utime(test_file, ns=(0, 0))
+    temp_repo.save_dir(temp_repo.working_dir)
+
+    blob_hash = hash_object(temp_repo.save_file_content(test_file))
+    delete_content(temp_repo.objects_dir(), blob_hash)
+    temp_repo.save_dir(temp_repo.working_dir)
+
+    assert (temp_repo.objects_dir() / blob_hash[:2] / blob_hash).exists()
+
+
+def test_save_dir_prunes_cache(temp_repo: Repository, tmp_path: Path) -> None:
+    test_file = temp_repo.working_dir / 'test_file.txt'
+    test_file.write_text('Removed later')
+    temp_repo.save_dir(temp_repo.working_dir)
+    assert str(test_file.absolute()) in json.loads(temp_repo.hash_cache_file().read_text())
+
+    test_file.unlink()
+    (tmp_path / 'outside.txt').write_text('Not in the working directory')
+    temp_repo.save_dir(temp_repo.working_dir)
+    temp_repo.save_dir(tmp_path)
+
+    assert json.loads(temp_repo.hash_cache_file().read_text()) == {}
+
+
+def test_save_dir_incremental_shares_hash_cache(temp_repo: Repository) -> None:
+    clean_file = temp_repo.working_dir / 'clean.txt'
+    clean_file.write_text('Unchanged')
+    previous_tree_ref = temp_repo.save_dir(temp_repo.working_dir)
+
+    dirty_file = temp_repo.working_dir / 'dirty.txt'
+    dirty_file.write_text('Added')
+    temp_repo.save_dir_incremental(temp_repo.working_dir, previous_tree_ref, {Path('dirty.txt')})
+
+    entries = json.loads(temp_repo.hash_cache_file().read_text())
+    assert str(clean_file.absolute()) in entries
+    assert str(dirty_file.absolute()) in entries
+
+
+def test_save_dir_incremental_matches_full_save(temp_repo: Repository) -> None:
+    sub_dir = temp_repo.working_dir / 'sub_dir'
+    sub_dir.mkdir()
+    (temp_repo.working_dir / 'file1.txt').write_text('Content of file1')
+    (sub_dir / 'file2.txt').write_text('Content of file2')
+    (sub_dir / 'file3.txt').write_text('Content of file3')
+    previous_tree_ref = temp_repo.save_dir(temp_repo.working_dir)
+
+    (sub_dir / 'file2.txt').write_text('Changed file2')
+    (sub_dir / 'file3.txt').unlink()
+    (temp_repo.working_dir / 'new_dir').mkdir()
+    (temp_repo.working_dir / 'new_dir' / 'file4.txt').write_text('Content of file4')
+
+    tree_ref = temp_repo.save_dir_incremental(temp_repo.working_dir, previous_tree_ref,
+                                              {Path('sub_dir/file2.txt'), Path('sub_dir/file3.txt'),
+                                               Path('new_dir')})
+
+    assert tree_ref == temp_repo.save_dir(temp_repo.working_dir)
+
+
+def test_save_dir_incremental_reuses_clean_paths(temp_repo: Repository) -> None:
+    clean_dir = temp_repo.working_dir / 'clean_dir'
+    clean_dir.mkdir()
+    (clean_dir / 'file1.txt').write_text('Content of file1')
+    (temp_repo.working_dir / 'file2.txt').write_text('Content of file2')
+    previous_tree_ref = temp_repo.save_dir(temp_repo.working_dir)
+
+    # Changes that are not reported as dirty are not picked up
+    (clean_dir / 'file1.txt').write_text('Unreported change')
+    (temp_repo.working_dir / 'file2.txt').write_text('Unreported change')
+
+    assert temp_repo.save_dir_incremental(temp_repo.working_dir, previous_tree_ref, set()) == previous_tree_ref
+
+
 def test_head_log(temp_repo: Repository) -> None:
     temp_file = temp_repo.working_dir / 'commit_test.txt'
 
@@ -141,6 +244,22 @@ def test_resolve_ref_invalid_string_raises_error(temp_repo: Repository) -> None:
         temp_repo.resolve_ref('abc123')
 
 
+def test_resolve_ref_branch_name_string(temp_repo: Repository) -> None:
+    (temp_repo.working_dir / 'test_file.txt').write_text('Branch content')
+    commit_ref = temp_repo.commit_working_dir('John Doe', 'Initial commit')
+
+    assert temp_repo.resolve_ref(DEFAULT_BRANCH) == commit_ref
+    assert temp_repo.resolve_ref(branch_ref(DEFAULT_BRANCH)) == commit_ref
+    assert temp_repo.resolve_ref(str(branch_ref(DEFAULT_BRANCH))) == commit_ref
+
+
+def test_resolve_ref_circular_reference_raises_error(temp_repo: Repository) -> None:
+    write_ref(temp_repo.heads_dir() / DEFAULT_BRANCH, SymRef('HEAD'))
+
+    with raises(RefError):
+        temp_repo.resolve_ref('HEAD')
+
+
 def test_resolve_ref_invalid_type_raises_error(temp_repo: Repository) -> None:
     with raises(RefError):
         temp_repo.resolve_ref(123)
@@ -168,6 +287,22 @@ def test_delete_repo_removes_repository(temp_repo: Repository) -> None:
     assert not temp_repo.exists()
 
 
+@mark.parametrize('remove', [Repository.delete_repo, lambda repo: rmtree(repo.repo_path())])
+def test_reinit_forgets_loaded_objects(temp_repo: Repository, remove: Callable[[Repository], None]) -> None:
+    test_file = temp_repo.working_dir / 'test_file.txt'
+    test_file.write_text('First version')
+    first_commit_ref = temp_repo.commit_working_dir('Author', 'First commit')
+    test_file.write_text('Second version')
+    second_commit_ref = temp_repo.commit_working_dir('Author', 'Second commit')
+    assert temp_repo.diff(first_commit_ref, second_commit_ref)
+
+    remove(temp_repo)
+    temp_repo.init()
+
+    with raises(RepositoryError):
+        temp_repo.diff(first_commit_ref, second_commit_ref)
+
+
 def test_add_empty_branch_name_raises_error(temp_repo: Repository) -> None:
     with raises(ValueError, match='Branch name is required'):
         temp_repo.add_branch('')